@@ -1,50 +1,60 @@
 import streamlit as st
 from bpe import HindiBPE
+from history import EncodedHistory
+from typing import Optional
 import json
 import os
 
-def load_bpe_model():
-    """Load BPE model from saved file or train new one"""
-    model_path = "data/bpe_model.json"
-    if os.path.exists(model_path):
-        bpe = HindiBPE()
-        bpe.load_model(model_path)
-        return bpe
-    else:
-        from download_data import download_hindi_corpus
-        from preprocessor import load_and_preprocess_data
-        
-        corpus_path = download_hindi_corpus()
-        processed_texts = load_and_preprocess_data(corpus_path)
-        
-        bpe = HindiBPE(vocab_size=50000)
-        bpe.fit(processed_texts[:1000])
-        bpe.save_model()
-        return bpe
+HISTORY_PAGE_SIZE = 20
+# Either format may be written by main.py or prune_model.py
+MODEL_PATHS = ["data/bpe_model.bin", "data/bpe_model.json"]
 
-def format_tokens(indices: list, token_mapping: dict) -> str:
-    """Format indices with their corresponding tokens"""
-    return ' '.join([f"{idx}({token_mapping[idx]})" for idx in indices])
+def find_model_path() -> Optional[str]:
+    """Return the most recently written model, or None when there is none"""
+    existing = [path for path in MODEL_PATHS if os.path.exists(path)]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+@st.cache_resource(max_entries=1)
+def load_bpe_model(model_path: str, mtime: float):
+    """Load the BPE model once per process, shared by all sessions
+    
+    mtime is part of the cache key, so a retrained model replaces the cached
+    one on the next rerun.
+    """
+    bpe = HindiBPE(instrument=True)
+    bpe.load_model(model_path)
+    return bpe
+
+@st.cache_data(max_entries=256)
+def format_tokens(indices: tuple, _token_mapping: dict) -> str:
+    """Format indices with their corresponding tokens, memoized per input"""
+    return ' '.join([f"{idx}({_token_mapping[idx]})" for idx in indices])
 
 def save_encoded_result(bpe_model, text: str, indices: list):
     """Save encoded text and its tokens"""
     bpe_model.save_encoded_text(text, indices)
 
-def load_encoded_texts():
-    """Load previously encoded texts"""
-    path = "data/encoded_texts.json"
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {'texts': []}
+@st.cache_resource
+def load_history():
+    """Open the encoded-text history once per process, shared by all sessions"""
+    return EncodedHistory()
+
+def load_encoded_texts(limit: int = HISTORY_PAGE_SIZE, offset: int = 0):
+    """Load a page of previously encoded texts, newest first"""
+    history = load_history()
+    return {'texts': history.recent(limit, offset), 'total': history.count()}
 
 def main():
     st.title("हिंदी BPE एनकोडर/डिकोडर (Hindi BPE Encoder/Decoder)")
     
-    # Initialize BPE model
-    if 'bpe_model' not in st.session_state:
-        with st.spinner('BPE मॉडल लोड हो रहा है... (Loading BPE model...)'):
-            st.session_state.bpe_model = load_bpe_model()
+    # Load the shared BPE model; a missing model is checked on every rerun
+    model_path = find_model_path()
+    if model_path is None:
+        st.error("No BPE model found. Train one offline first: `python main.py` "
+                 "(add `--vocab-size 50000` for a larger vocabulary).")
+        st.stop()
+    with st.spinner('BPE मॉडल लोड हो रहा है... (Loading BPE model...)'):
+        bpe_model = load_bpe_model(model_path, os.path.getmtime(model_path))
     
     # Create tabs for encode, decode, and history
     tab1, tab2, tab3 = st.tabs(["एनकोड (Encode)", "डिकोड (Decode)", "इतिहास (History)"])
@@ -62,11 +72,11 @@ def main():
         if st.button("एनकोड करें (Encode)"):
             if input_text:
                 # Encode the text
-                indices = st.session_state.bpe_model.encode(input_text)
-                token_mapping = st.session_state.bpe_model.get_token_mapping()
+                indices = bpe_model.encode(input_text)
+                token_mapping = bpe_model.get_token_mapping()
                 
                 # Save the encoded result
-                save_encoded_result(st.session_state.bpe_model, input_text, indices)
+                save_encoded_result(bpe_model, input_text, indices)
                 
                 # Display results
                 st.subheader("एनकोडेड टोकन (Encoded Tokens):")
@@ -79,7 +89,7 @@ def main():
                 )
                 
                 # Display indices with corresponding tokens
-                formatted_tokens = format_tokens(indices, token_mapping)
+                formatted_tokens = format_tokens(tuple(indices), token_mapping)
                 st.text_area(
                     "इंडेक्स और टोकन (Indices with Tokens):", 
                     formatted_tokens, 
@@ -134,7 +144,7 @@ def main():
                         indices = [int(idx) for idx in indices_input.strip().split()]
                     
                     # Decode indices
-                    decoded_text = st.session_state.bpe_model.decode(indices)
+                    decoded_text = bpe_model.decode(indices)
                     
                     # Display result
                     st.subheader("डिकोडेड टेक्स्ट (Decoded Text):")
@@ -150,20 +160,38 @@ def main():
     with tab3:
         st.subheader("एनकोडेड टेक्स्ट इतिहास (Encoded Text History)")
         
-        # Load and display encoded history
-        encoded_history = load_encoded_texts()
+        # Load and display one page of encoded history
+        page = st.number_input("पृष्ठ (Page):", min_value=1, value=1, step=1)
+        offset = (page - 1) * HISTORY_PAGE_SIZE
+        encoded_history = load_encoded_texts(HISTORY_PAGE_SIZE, offset)
         
         if encoded_history['texts']:
-            for idx, entry in enumerate(reversed(encoded_history['texts'])):
-                with st.expander(f"Text {idx + 1}: {entry['original_text'][:50]}..."):
-                    st.write("Original Text:")
-                    st.write(entry['original_text'])
-                    st.write("Encoded Indices:")
-                    st.code(json.dumps(entry['indices']))
-                    st.write("Tokens:")
-                    st.write(entry['token_mappings'])
+            st.caption(f"Showing {offset + 1}-{offset + len(encoded_history['texts'])} "
+                       f"of {encoded_history['total']}")
+            # Only the selected entry is rendered in full
+            entries = encoded_history['texts']
+            selected = st.selectbox(
+                "टेक्स्ट चुनें (Select text):",
+                range(len(entries)),
+                format_func=lambda i: f"Text {offset + i + 1}: {entries[i]['original_text'][:50]}..."
+            )
+            entry = entries[selected]
+            st.write("Original Text:")
+            st.write(entry['original_text'])
+            st.write("Encoded Indices:")
+            st.code(json.dumps(entry['indices']))
+            st.write("Tokens:")
+            st.write(entry['token_mappings'])
         else:
             st.write("No encoded texts in history.")
+    
+    # Live tokenizer statistics for this session's model
+    with st.sidebar:
+        st.subheader("आंकड़े (Tokenizer Stats)")
+        stats = bpe_model.stats()
+        st.write(f"UNK rate: {stats['unk_rate']:.2%}")
+        st.write(f"Cache: {stats['cache']['hits']} hits / {stats['cache']['misses']} misses")
+        st.json(stats)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,175 @@
+from bpe import HindiBPE
+from instrumentation import peak_rss_mb
+from preprocessor import load_and_preprocess_data
+from trie import divergence_report
+from typing import Dict, List
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+CORPUS_PATH = "data/hindi_corpus.txt"
+
+_COLD_START = """
+import json, time
+from bpe import HindiBPE
+from instrumentation import peak_rss_mb
+start = time.perf_counter()
+bpe = HindiBPE()
+bpe.load_model({path!r})
+loaded = time.perf_counter()
+bpe.encode("भारत एक विशाल देश है")
+encoded = time.perf_counter()
+print(json.dumps({{'load_seconds': loaded - start, 'first_encode_seconds': encoded - loaded}}))
+"""
+
+
+def build_corpus(target_chars: int, seed: int = 0, corpus_path: str = CORPUS_PATH) -> List[str]:
+    """Scale the bundled corpus up by sampling sentences from its words"""
+    words = [word for text in load_and_preprocess_data(corpus_path) for word in text.split()]
+    rng = random.Random(seed)
+    texts = []
+    total = 0
+    while total < target_chars:
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(3, 15)))
+        texts.append(text)
+        total += len(text)
+    return texts
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench_fit(texts: List[str], vocab_size: int, word_level: bool, engine: str = 'python') -> Dict:
+    """Time fit and report the cost per learned merge"""
+    bpe = HindiBPE(vocab_size=vocab_size)
+    start = time.perf_counter()
+    bpe.fit(texts, word_level=word_level, engine=engine)
+    elapsed = time.perf_counter() - start
+    merges = len(bpe.merges)
+    return {
+        'vocab_size': vocab_size,
+        'word_level': word_level,
+        'engine': engine,
+        'merges': merges,
+        'seconds': elapsed,
+        'seconds_per_merge': elapsed / merges if merges else 0.0,
+        'merge_list': list(bpe.merges),
+    }
+
+
+def bench_encode_decode(bpe: HindiBPE, texts: List[str], legacy: bool = False,
+                        longest_match: bool = False) -> Dict:
+    """Measure encode/decode throughput and per-sentence encode latency"""
+    bpe.cache.clear()
+    latencies = []
+    encoded = []
+    start = time.perf_counter()
+    for text in texts:
+        t0 = time.perf_counter()
+        encoded.append(bpe.encode(text, legacy=legacy, longest_match=longest_match))
+        latencies.append(time.perf_counter() - t0)
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for indices in encoded:
+        bpe.decode(indices)
+    decode_seconds = time.perf_counter() - start
+
+    chars = sum(len(text) for text in texts)
+    tokens = sum(len(indices) for indices in encoded)
+    return {
+        'sentences': len(texts),
+        'chars': chars,
+        'tokens': tokens,
+        'encode_chars_per_sec': chars / encode_seconds,
+        'encode_tokens_per_sec': tokens / encode_seconds,
+        'encode_p50_ms': percentile(latencies, 50) * 1000,
+        'encode_p99_ms': percentile(latencies, 99) * 1000,
+        'decode_chars_per_sec': chars / decode_seconds,
+        'decode_tokens_per_sec': tokens / decode_seconds,
+        'cache': bpe.cache_info(),
+    }
+
+
+def bench_cold_start(path: str, repeat: int = 3) -> Dict:
+    """Time load_model plus a first encode in fresh interpreter processes"""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', _COLD_START.format(path=path)],
+                                capture_output=True, text=True, check=True)
+        runs.append(json.loads(result.stdout))
+    return {
+        'load_seconds': min(run['load_seconds'] for run in runs),
+        'first_encode_seconds': min(run['first_encode_seconds'] for run in runs),
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict:
+    texts = build_corpus(args.chars, seed=args.seed)
+    fit_texts = texts[:args.fit_sentences]
+    fit_report = bench_fit(fit_texts, args.vocab_size, args.word_level)
+    merge_list = fit_report.pop('merge_list')
+    report = {
+        'corpus': {'sentences': len(texts), 'chars': sum(len(text) for text in texts), 'seed': args.seed},
+        'fit': fit_report,
+        'models': {},
+    }
+    if args.numpy_engine:
+        numpy_report = bench_fit(fit_texts, args.vocab_size, args.word_level, engine='numpy')
+        numpy_report['same_merges'] = numpy_report.pop('merge_list') == merge_list
+        report['fit_numpy'] = numpy_report
+
+    for path in args.models:
+        bpe = HindiBPE(cache_size=args.cache_size)
+        bpe.load_model(path)
+        model_report = {
+            'cold_start': bench_cold_start(path),
+            'encode_decode': bench_encode_decode(bpe, texts),
+        }
+        if args.legacy:
+            model_report['encode_decode_legacy'] = bench_encode_decode(bpe, texts, legacy=True)
+        if args.longest_match:
+            model_report['encode_decode_longest_match'] = bench_encode_decode(bpe, texts, longest_match=True)
+            model_report['longest_match_divergence'] = divergence_report(bpe, texts)
+        report['models'][path] = model_report
+
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Hindi BPE tokenizer")
+    parser.add_argument('--models', nargs='+', default=["data/bpe_model.json"],
+                        help="model files to benchmark (JSON or binary)")
+    parser.add_argument('--chars', type=int, default=200000,
+                        help="size of the synthetic corpus in characters")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the synthetic corpus")
+    parser.add_argument('--vocab-size', type=int, default=1000, help="vocabulary size for the fit benchmark")
+    parser.add_argument('--fit-sentences', type=int, default=2000,
+                        help="number of corpus sentences used for the fit benchmark")
+    parser.add_argument('--word-level', action='store_true', help="benchmark word-level training")
+    parser.add_argument('--numpy-engine', action='store_true',
+                        help="also benchmark fit with the vectorized NumPy engine (needs numpy)")
+    parser.add_argument('--cache-size', type=int, default=10000, help="encode cache size, 0 to disable")
+    parser.add_argument('--legacy', action='store_true', help="also benchmark the legacy encoder")
+    parser.add_argument('--longest-match', action='store_true',
+                        help="also benchmark the trie longest-match encoder and its divergence")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run_benchmarks(args), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
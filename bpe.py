@@ -1,20 +1,139 @@
-from typing import Dict, List, Tuple, Set
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Set, Union
 from collections import defaultdict
 import re
+import heapq
 import json
 import os
+import multiprocessing
+import threading
+import time
+
+from cache import LRUCache
+from history import DEFAULT_HISTORY_PATH, EncodedHistory
+from model_format import BinaryModel, is_binary_model, write_binary_model
+from normalizer import Normalizer
+from packed_ids import to_id_array
+from instrumentation import Instrumentation, peak_rss_mb, timed_method
+from preprocessor import count_words, split_words
+from preprocessor import metrics as preprocessor_metrics
+from trainer import CompactPairTrainer, PairTrainer
+from trie import TokenTrie
+
+_ID_MASK = 0xFFFFFFFF
+# Policies for unknown indices accepted by decode and decode_to_bytes
+_DECODE_ERRORS = ('skip', 'replace', 'raise')
+
+# Model shared with batch worker processes, set once per worker by the pool initializer
+_worker_model: Optional["HindiBPE"] = None
+
+def _init_batch_worker(model: "HindiBPE") -> None:
+    global _worker_model
+    _worker_model = model
+
+def _encode_in_worker(text: str) -> List[int]:
+    return _worker_model.encode(text)
+
+def _decode_in_worker(indices: List[int]) -> str:
+    return _worker_model.decode(indices)
+
+def _trainer_class(engine: str):
+    """Return the pair statistics engine used by fit"""
+    if engine == 'python':
+        return PairTrainer
+    if engine == 'compact':
+        return CompactPairTrainer
+    if engine == 'numpy':
+        # NumPy is optional, so only import the vectorized engine on request
+        from vectorized_trainer import VectorizedPairTrainer
+        return VectorizedPairTrainer
+    raise ValueError(f"Unknown training engine: {engine}")
+
+def _as_int_list(indices: Iterable[int]) -> Iterable[int]:
+    # Array elements are not plain ints, so unpack them in one C call
+    # instead of hashing NumPy scalars in the lookup loop
+    if hasattr(indices, 'tolist'):
+        return indices.tolist()
+    return indices
+
+
+# Serializes lazy table builds; reentrant because builders read other lazy tables
+_lazy_lock = threading.RLock()
+
+
+class _Lazy:
+    """Table built on first access from a builder registered with HindiBPE._set_lazy
+
+    Once built, the value lives in the instance __dict__, which shadows this
+    descriptor, so later lookups cost nothing extra. Builds run under a
+    lock, so threads sharing a model never see a table half registered.
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        with _lazy_lock:
+            # Another thread may have built the table while this one waited
+            if self.name in obj.__dict__:
+                return obj.__dict__[self.name]
+            try:
+                builder = obj._pending[self.name]
+            except KeyError:
+                raise AttributeError(self.name) from None
+            value = obj.__dict__[self.name] = builder()
+            del obj._pending[self.name]
+            return value
 
 class HindiBPE:
-    def __init__(self, vocab_size: int = 5000):
+    merges = _Lazy()
+    vocab = _Lazy()
+    reverse_merges = _Lazy()
+    _merge_table = _Lazy()
+    token_to_index = _Lazy()
+    index_to_token = _Lazy()
+    _word_local = _Lazy()
+    _token_strings = _Lazy()
+    _token_bytes = _Lazy()
+    _trie = _Lazy()
+    
+    def __init__(self, vocab_size: int = 5000, cache_size: int = 10000, instrument: bool = False,
+                 normalizer: Optional[Normalizer] = None, special_tokens: Iterable[str] = (),
+                 byte_fallback: bool = False, min_freq: int = 1):
+        self._pending = {}
         self.vocab_size = vocab_size
         self.merges: Dict[Tuple[str, str], str] = {}
         self.vocab: Set[str] = set()
         self.reverse_merges: Dict[str, Tuple[str, str]] = {}
+        # (left_id << 32 | right_id) -> (rank << 32 | merged_id)
+        self._merge_table: Dict[int, int] = {}
+        self._token_strings: Dict[int, str] = {}
+        self._token_bytes: Dict[int, bytes] = {}
         self.token_to_index: Dict[str, int] = {}
         self.index_to_token: Dict[int, str] = {}
         self.UNK_TOKEN = "<UNK>"
-        self.min_freq = 1
+        # Pairs seen fewer times than this are never merged
+        self.min_freq = min_freq
+        # Filled in by fit(memory_budget_mb=...), see stats()
+        self.memory_report: Optional[Dict] = None
+        # Word -> indices cache, cleared whenever the merge table changes
+        self.cache = LRUCache(cache_size)
+        # Hot-path counters and timers, see stats()
+        self.metrics = Instrumentation(enabled=instrument)
+        self._word_local = True
+        # Applied to text before encoding, see normalizer.Normalizer
+        self.normalizer = normalizer
+        # Tokens matched verbatim in the input and never split or merged
+        self.special_tokens: List[str] = list(special_tokens)
+        self._special_pattern: Optional[re.Pattern] = None
+        # With byte fallback, characters outside the vocabulary are encoded
+        # as their UTF-8 bytes, using 256 tokens starting at _byte_offset
+        self.byte_fallback = byte_fallback
+        self._byte_offset: Optional[int] = None
+        # History stores opened by save_encoded_text, one per path
+        self._histories: Dict[str, EncodedHistory] = {}
         
+    @timed_method('get_stats')
     def get_stats(self, words: List[List[str]]) -> Dict[Tuple[str, str], int]:
         """Count frequency of adjacent pairs"""
         pairs = defaultdict(int)
@@ -25,6 +144,7 @@ class HindiBPE:
                 
         return pairs
     
+    @timed_method('merge_vocab')
     def merge_vocab(self, words: List[List[str]], pair: Tuple[str, str]) -> List[List[str]]:
         """Merge all occurrences of the most frequent pair"""
         first, second = pair
@@ -49,56 +169,579 @@ class HindiBPE:
             
         return new_words
     
-    def fit(self, texts: List[str]) -> None:
-        """Learn BPE merges from texts"""
-        # Initialize vocabulary with characters
-        words = [[char for char in text] for text in texts]
-        self.vocab = set(char for text in texts for char in text)
-        self.vocab.add(self.UNK_TOKEN)
+    @timed_method('fit')
+    def fit(self, texts: Optional[Union[Iterable[str], Dict[str, int]]], word_level: bool = False,
+            checkpoint_path: Optional[str] = None, checkpoint_every: int = 1000,
+            resume: bool = False, engine: str = 'python', memory_budget_mb: Optional[float] = None) -> None:
+        """Learn BPE merges from texts
         
-        # Initialize token indices for characters and special tokens
-        self.token_to_index = {self.UNK_TOKEN: 0}
-        self.index_to_token = {0: self.UNK_TOKEN}
+        With word_level=True, texts are split into space-prefixed words and
+        each unique word is trained once, weighted by its count. A dict of
+        word counts (as returned by count_words) is always trained this way.
+        texts may be a generator such as preprocessor.iter_preprocessed.
         
-        for idx, token in enumerate(sorted(self.vocab - {self.UNK_TOKEN}), start=1):
-            self.token_to_index[token] = idx
-            self.index_to_token[idx] = token
+        With checkpoint_path set, the merges so far and the current corpus
+        segmentation are written there every checkpoint_every merges. With
+        resume=True an existing checkpoint is loaded instead of texts (which
+        may then be None) and training continues up to vocab_size.
         
-        next_idx = len(self.vocab)
+        engine='numpy' counts pairs with the vectorized NumPy engine in
+        vectorized_trainer.py and engine='compact' with the array-based
+        trainer.CompactPairTrainer; both learn the same merges.
         
-        for i in range(self.vocab_size - len(self.vocab)):
-            pairs = self.get_stats(words)
-            if not pairs:
-                break
+        memory_budget_mb bounds the memory of word-level training. It uses
+        the compact engine and trains on the most frequent words that fit
+        the budget, less what the process already used; the remaining
+        low-frequency words are excluded from training, so the merges can
+        differ from an unbounded run. A dict of word counts is handed over
+        to fit and emptied once the words to train on are picked, so that
+        the excluded words are freed before training starts. ValueError is
+        raised if the budget leaves room for no word at all. The outcome,
+        including the peak RSS of the process, is kept in memory_report.
+        """
+        report = None
+        if memory_budget_mb is not None:
+            # Only the compact engine has a predictable size per symbol
+            engine = 'compact'
+            report = {'budget_mb': memory_budget_mb}
+        trainer_class = _trainer_class(engine)
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            trainer = self._load_checkpoint(checkpoint_path, trainer_class)
+        else:
+            if report is not None:
+                words, weights = self._budget_corpus(texts, word_level, report)
+            else:
+                words, weights = self._prepare_corpus(texts, word_level)
+            
+            # Initialize vocabulary with characters
+            self.vocab = set(char for word in words for char in word)
+            self.vocab.add(self.UNK_TOKEN)
+            
+            # Initialize token indices for characters and special tokens
+            self.token_to_index = {self.UNK_TOKEN: 0}
+            self.index_to_token = {0: self.UNK_TOKEN}
+            self.merges = {}
+            self.reverse_merges = {}
+            # Byte tokens of an earlier fit or loaded model are gone, so
+            # _add_reserved_tokens appends them again after the merges
+            self._byte_offset = None
+            
+            for idx, token in enumerate(sorted(self.vocab - {self.UNK_TOKEN}), start=1):
+                self.token_to_index[token] = idx
+                self.index_to_token[idx] = token
             
-            # Filter pairs by minimum frequency
-            frequent_pairs = {pair: freq for pair, freq in pairs.items() 
-                            if freq >= self.min_freq}
-            if not frequent_pairs:
+            # Pair counts are kept up to date incrementally instead of calling
+            # get_stats/merge_vocab over the whole corpus on every merge
+            with self.metrics.timed('fit.count_pairs'):
+                trainer = trainer_class(words, weights, self.min_freq)
+            del words, weights
+        
+        self._train(trainer, checkpoint_path, checkpoint_every)
+        if report is not None:
+            report['peak_rss_mb'] = peak_rss_mb()
+            report['within_budget'] = report['peak_rss_mb'] is None or report['peak_rss_mb'] <= memory_budget_mb
+            self.memory_report = report
+    
+    @timed_method('extend')
+    def extend(self, texts: Union[Iterable[str], Dict[str, int]], vocab_size: int, word_level: bool = False,
+               checkpoint_path: Optional[str] = None, checkpoint_every: int = 1000,
+               engine: str = 'python') -> None:
+        """Continue training a loaded model up to a larger vocab_size
+        
+        The existing merges are replayed on texts in rank order and training
+        picks up from there, so existing token ids stay valid. On the corpus
+        the model was trained on, this learns the same merges as training
+        from scratch with the larger vocab_size. Characters the model has
+        never seen are added after the existing tokens.
+        """
+        words, weights = self._prepare_corpus(texts, word_level)
+        merges = list(self.merges)
+        self.token_to_index = dict(self.token_to_index)
+        self.index_to_token = dict(self.index_to_token)
+        self.merges = dict(self.merges)
+        self.reverse_merges = dict(self.reverse_merges)
+        self.vocab = set(self.vocab)
+        
+        for char in sorted(set(char for word in words for char in word) - self.vocab):
+            self._add_token(char)
+        
+        with self.metrics.timed('fit.count_pairs'):
+            trainer = _trainer_class(engine)(words, weights, self.min_freq)
+        with self.metrics.timed('extend.replay'):
+            for pair in merges:
+                trainer.merge(pair)
+        
+        self.vocab_size = vocab_size
+        self._train(trainer, checkpoint_path, checkpoint_every)
+    
+    def _prepare_corpus(self, texts: Union[Iterable[str], Dict[str, int]],
+                        word_level: bool) -> Tuple[List[str], Optional[List[int]]]:
+        """Return the texts to train on, with per-word weights for word counts
+
+        Texts, or the words of word counts, go through the normalizer first
+        so that training sees what _encode_text will encode.
+        """
+        if self.normalizer is not None:
+            if isinstance(texts, dict):
+                # Words that normalize alike are counted together
+                normalized = {}
+                for word, count in texts.items():
+                    word = self.normalizer(word)
+                    normalized[word] = normalized.get(word, 0) + count
+                texts = normalized
+            else:
+                texts = map(self.normalizer, texts)
+        if word_level and not isinstance(texts, dict):
+            texts = count_words(texts)
+        elif not isinstance(texts, dict):
+            texts = list(texts)
+        
+        weights = None
+        if isinstance(texts, dict):
+            weights = list(texts.values())
+            texts = list(texts.keys())
+        # The trainers iterate over characters, so strings need no splitting
+        return texts, weights
+    
+    def _budget_corpus(self, texts: Union[Iterable[str], Dict[str, int]], word_level: bool,
+                       report: Dict) -> Tuple[List[str], List[int]]:
+        """Keep the most frequent words whose training tables fit report['budget_mb']"""
+        if not word_level and not isinstance(texts, dict):
+            raise ValueError("memory_budget_mb requires word-level training")
+        words, weights = self._prepare_corpus(texts, word_level)
+        if isinstance(texts, dict):
+            # The caller's table would keep every excluded word alive for
+            # the whole training run
+            texts.clear()
+        
+        # The process peak so far is a safe upper bound on what is already in use
+        used_mb = peak_rss_mb() or 0.0
+        if report['budget_mb'] <= used_mb:
+            raise ValueError(f"memory_budget_mb={report['budget_mb']} leaves nothing for training, "
+                             f"the process already used {used_mb:.1f} MB")
+        available = (report['budget_mb'] - used_mb) * 1024 * 1024
+        estimated = 0
+        kept = 0
+        # Most frequent words first, ties in corpus order
+        order = sorted(range(len(words)), key=weights.__getitem__, reverse=True)
+        for idx in order:
+            size = len(words[idx]) * CompactPairTrainer.BYTES_PER_SYMBOL
+            if estimated + size > available:
+                break
+            estimated += size
+            kept += 1
+        if words and not kept:
+            raise ValueError(f"memory_budget_mb={report['budget_mb']} is too small to train on any word")
+        excluded = order[kept:]
+        
+        report.update({
+            'estimated_mb': estimated / (1024 * 1024),
+            'trained_words': kept,
+            # Excluded words are left out of training, so the merges can
+            # differ from an unbounded run
+            'excluded_words': len(excluded),
+            'excluded_occurrences': sum(weights[idx] for idx in excluded),
+        })
+        # Restore corpus order so ties between pairs break as in a full run
+        keep = sorted(order[:kept])
+        return [words[idx] for idx in keep], [weights[idx] for idx in keep]
+    
+    def _add_token(self, token: str) -> None:
+        idx = len(self.index_to_token)
+        self.vocab.add(token)
+        self.token_to_index[token] = idx
+        self.index_to_token[idx] = token
+    
+    def _train(self, trainer: PairTrainer, checkpoint_path: Optional[str], checkpoint_every: int) -> None:
+        """Learn merges from trainer until the vocabulary reaches vocab_size"""
+        metrics = self.metrics
+        # Special and byte tokens already in the vocabulary do not count
+        # towards vocab_size, so extending such a model learns the same merges
+        reserved = sum(1 for token in self.special_tokens if token in self.token_to_index)
+        if self._byte_offset is not None:
+            reserved += 256
+        # Every merge adds one index, so this also holds for resumed runs
+        while len(self.index_to_token) - reserved < self.vocab_size:
+            if metrics.enabled:
+                iteration_start = time.perf_counter()
+            with metrics.timed('fit.best_pair'):
+                best_pair = trainer.best_pair(self.min_freq)
+            if best_pair is None:
                 break
             
-            best_pair = max(frequent_pairs.items(), key=lambda x: x[1])[0]
-            words = self.merge_vocab(words, best_pair)
             merged_token = ''.join(best_pair)
             
-            # Skip adding to vocabulary if the token is longer than 5 characters
+            # Overlong tokens are never merged, so the same pair would win
+            # every remaining iteration without changing anything
             if len(merged_token) > 35:
-                continue
+                break
             
+            with metrics.timed('fit.merge'):
+                trainer.merge(best_pair)
             self.merges[best_pair] = merged_token
             self.reverse_merges[merged_token] = best_pair
-            self.vocab.add(merged_token)
-            self.token_to_index[merged_token] = next_idx
-            self.index_to_token[next_idx] = merged_token
-            next_idx += 1
+            self._add_token(merged_token)
+            if metrics.enabled:
+                metrics.observe('fit.iteration', time.perf_counter() - iteration_start)
+            if checkpoint_path and len(self.merges) % checkpoint_every == 0:
+                self._write_checkpoint(checkpoint_path, trainer)
+        
+        self._add_reserved_tokens()
+        if checkpoint_path:
+            self._write_checkpoint(checkpoint_path, trainer)
+        self._rebuild_tables()
+    
+    def _add_reserved_tokens(self) -> None:
+        """Append missing special tokens and, if enabled, the 256 byte tokens"""
+        for token in self.special_tokens:
+            if token not in self.token_to_index:
+                self._add_token(token)
+        if self.byte_fallback and self._byte_offset is None:
+            self._byte_offset = len(self.index_to_token)
+            for byte in range(256):
+                self._add_token(f"<0x{byte:02X}>")
+    
+    def add_special_tokens(self, tokens: Iterable[str]) -> None:
+        """Register special tokens, appending new ones to the vocabulary
+        
+        Special tokens are found in one regex pass before normal encoding,
+        and always encode to their own index.
+        """
+        self.special_tokens.extend(token for token in tokens if token not in self.special_tokens)
+        self._add_reserved_tokens()
+        self._rebuild_tables()
+    
+    def enable_byte_fallback(self) -> None:
+        """Append 256 byte tokens so text outside the vocabulary round-trips losslessly"""
+        self.byte_fallback = True
+        self._add_reserved_tokens()
+        self._rebuild_tables()
+    
+    def prune(self, merges: Iterable[Tuple[str, str]]) -> Tuple["HindiBPE", Dict[int, int]]:
+        """Return a re-indexed copy keeping only the given merges, and the old -> new id map
+        
+        Merges keep their rank order, minus any whose parts are no longer
+        in the vocabulary. Characters, special and byte tokens are always
+        kept. Tokens of dropped merges and shadowed duplicates, which encode
+        never emits, are removed, and the remaining ids close up in order.
+        """
+        keep = set(merges)
+        merged_tokens = set(self.merges.values())
+        available = {token for token in self.token_to_index if token not in merged_tokens}
+        kept_merges = {}
+        for pair, token in self.merges.items():
+            if pair in keep and pair[0] in available and pair[1] in available:
+                kept_merges[pair] = token
+                available.add(token)
+    
+        special_tokens = set(self.special_tokens)
+        id_map = {}
+        for idx in range(len(self.index_to_token)):
+            token = self.index_to_token[idx]
+            # Later indices win for duplicate tokens, so earlier ones are dead
+            if self.token_to_index[token] != idx:
+                continue
+            if token in available or token in special_tokens or self._is_byte_id(idx):
+                id_map[idx] = len(id_map)
+    
+        pruned = HindiBPE(cache_size=self.cache.maxsize, instrument=self.metrics.enabled,
+                          normalizer=self.normalizer, special_tokens=self.special_tokens,
+                          byte_fallback=self.byte_fallback, min_freq=self.min_freq)
+        pruned.index_to_token = {new: self.index_to_token[old] for old, new in id_map.items()}
+        pruned.token_to_index = {token: idx for idx, token in pruned.index_to_token.items()}
+        pruned.vocab = set(pruned.token_to_index)
+        pruned.merges = kept_merges
+        pruned.reverse_merges = {token: pair for pair, token in kept_merges.items()}
+        reserved = sum(1 for token in pruned.special_tokens if token in pruned.token_to_index)
+        if self._byte_offset is not None:
+            # Byte tokens are all kept, so they stay contiguous
+            pruned._byte_offset = id_map[self._byte_offset]
+            reserved += 256
+        pruned.vocab_size = len(id_map) - reserved
+        pruned._rebuild_tables()
+        return pruned, id_map
     
-    def encode(self, text: str) -> List[int]:
-        """Encode text using learned BPE merges and return indices"""
+    def _model_config(self) -> Dict:
+        """Return the encoding settings stored alongside the vocabulary"""
+        return {
+            'special_tokens': self.special_tokens,
+            'byte_fallback': self._byte_offset,
+            'normalizer': self.normalizer.to_dict() if self.normalizer is not None else None,
+        }
+    
+    def _apply_model_config(self, config: Dict) -> None:
+        """Restore settings from _model_config; models without them get the defaults"""
+        self.special_tokens = list(config.get('special_tokens', []))
+        self._byte_offset = config.get('byte_fallback')
+        self.byte_fallback = self._byte_offset is not None
+        if config.get('normalizer') is not None:
+            self.normalizer = Normalizer.from_dict(config['normalizer'])
+    
+    @timed_method('fit.checkpoint')
+    def _write_checkpoint(self, path: str, trainer: PairTrainer) -> None:
+        """Atomically write the merges so far and the corpus segmentation
+        
+        The segmentation is stored as token ids with one length and weight
+        per word, which is far smaller than the corpus text.
+        """
+        token_to_index = self.token_to_index
+        ids = []
+        lengths = []
+        for word in trainer.words():
+            ids.extend(token_to_index[symbol] for symbol in word)
+            lengths.append(len(word))
+        checkpoint = {
+            'vocab_size': self.vocab_size,
+            'tokens': [self.index_to_token[idx] for idx in range(len(self.index_to_token))],
+            'merges': [[token_to_index[first], token_to_index[second]] for first, second in self.merges],
+            'corpus': {'ids': ids, 'lengths': lengths, 'weights': trainer.weights()},
+            'config': self._model_config(),
+        }
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    
+    def _load_checkpoint(self, path: str, trainer_class=PairTrainer) -> PairTrainer:
+        """Restore the tables from a checkpoint and return a trainer over its corpus"""
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        
+        tokens = checkpoint['tokens']
+        self._apply_model_config(checkpoint.get('config', {}))
+        self.index_to_token = dict(enumerate(tokens))
+        # Later indices win for duplicate tokens, as they do in fit
+        self.token_to_index = {token: idx for idx, token in enumerate(tokens)}
+        self.vocab = set(tokens)
+        self.merges = {}
+        self.reverse_merges = {}
+        for first, second in checkpoint['merges']:
+            pair = (tokens[first], tokens[second])
+            self.merges[pair] = tokens[first] + tokens[second]
+            self.reverse_merges[tokens[first] + tokens[second]] = pair
+        
+        corpus = checkpoint['corpus']
+        ids = corpus['ids']
+        words = []
+        position = 0
+        for length in corpus['lengths']:
+            words.append([tokens[idx] for idx in ids[position:position + length]])
+            position += length
+        # Word order is kept, so ties between pairs still break as they
+        # would have without the interruption
+        return trainer_class(words, corpus['weights'], self.min_freq)
+    
+    def _set_lazy(self, name: str, builder) -> None:
+        """Replace a table with one built by builder on first access"""
+        with _lazy_lock:
+            self.__dict__.pop(name, None)
+            self._pending[name] = builder
+    
+    def _rebuild_tables(self, merge_ids: Optional[Callable[[], List[Tuple[int, int]]]] = None) -> None:
+        """Rebuild lookup tables derived from the merges
+        
+        merge_ids optionally supplies (left_id, right_id) pairs in rank order,
+        so the integer table can be built without the string merges.
+        """
+        def build_merge_table():
+            token_to_index = self.token_to_index
+            index_to_token = self.index_to_token
+            if merge_ids is not None:
+                pairs = merge_ids()
+            else:
+                pairs = [(token_to_index[first], token_to_index[second]) for first, second in self.merges]
+            table = {}
+            for rank, (left, right) in enumerate(pairs):
+                merged = token_to_index[index_to_token[left] + index_to_token[right]]
+                table[left << 32 | right] = rank << 32 | merged
+            return table
+        
+        def build_token_bytes():
+            table = {idx: token.encode('utf-8') for idx, token in self._token_strings.items()}
+            if self._byte_offset is not None:
+                table.update((self._byte_offset + byte, bytes([byte])) for byte in range(256))
+            return table
+        
+        self._set_lazy('_merge_table', build_merge_table)
+        # Surface strings and UTF-8 bytes per index for decode, without <UNK>.
+        # Byte tokens only have bytes, as they may hold part of a character
+        self._set_lazy('_token_strings', lambda: {idx: token for idx, token in self.index_to_token.items()
+                                                  if token != self.UNK_TOKEN and not self._is_byte_id(idx)})
+        self._set_lazy('_token_bytes', build_token_bytes)
+        # Encoding word by word only matches whole-text encoding when no
+        # merge joins a word to the space that starts the next one
+        self._set_lazy('_word_local', lambda: all(' ' not in self.index_to_token[value & _ID_MASK][1:]
+                                                  for value in self._merge_table.values()))
+        self._set_lazy('_trie', lambda: TokenTrie.from_tokens(
+            {token: idx for token, idx in self.token_to_index.items()
+             if token != self.UNK_TOKEN and token not in self.special_tokens and not self._is_byte_id(idx)}))
+        # Longest alternatives first, so one special token never hides a longer one
+        self._special_pattern = None
+        if self.special_tokens:
+            self._special_pattern = re.compile('(' + '|'.join(
+                re.escape(token) for token in sorted(self.special_tokens, key=len, reverse=True)) + ')')
+        self.cache.clear()
+    
+    def _is_byte_id(self, idx: int) -> bool:
+        return self._byte_offset is not None and self._byte_offset <= idx < self._byte_offset + 256
+    
+    def __getstate__(self):
+        # Build pending tables so nothing refers to an open model file
+        for name in list(self._pending):
+            getattr(self, name)
+        state = self.__dict__.copy()
+        state['_pending'] = {}
+        return state
+    
+    def encode(self, text: str, legacy: bool = False, longest_match: bool = False,
+               as_array: bool = False) -> List[int]:
+        """Encode text using learned BPE merges and return indices
+        
+        Merges are applied lowest rank first, in training order. Pass
+        legacy=True to reproduce indices from the old leftmost-pair encoder,
+        or longest_match=True for a faster greedy longest-token segmentation
+        that may differ from merge replay (see trie.divergence_report).
+        as_array=True returns a uint16 array (uint32 above 65536 tokens),
+        as a NumPy array when NumPy is installed and a stdlib array otherwise.
+        """
+        if self.metrics.enabled:
+            start = time.perf_counter()
+            indices = self._encode(text, legacy, longest_match)
+            self.metrics.observe('encode', time.perf_counter() - start)
+            self.metrics.incr('encode.chars', len(text))
+            self.metrics.incr('encode.tokens', len(indices))
+            self.metrics.incr('encode.unk', indices.count(self.token_to_index[self.UNK_TOKEN]))
+        else:
+            indices = self._encode(text, legacy, longest_match)
+        if as_array:
+            return to_id_array(indices, len(self.index_to_token))
+        return indices
+    
+    def _encode(self, text: str, legacy: bool, longest_match: bool) -> List[int]:
+        if self._special_pattern is None:
+            return self._encode_text(text, legacy, longest_match)
+        
+        # re.split with one group alternates plain text and special tokens
+        indices = []
+        for i, part in enumerate(self._special_pattern.split(text)):
+            if i % 2:
+                indices.append(self.token_to_index[part])
+            elif part:
+                indices.extend(self._encode_text(part, legacy, longest_match))
+        return indices
+    
+    def _encode_text(self, text: str, legacy: bool, longest_match: bool) -> List[int]:
+        if self.normalizer is not None:
+            text = self.normalizer(text)
         if not text:
             return []
         
-        word = [char for char in text]
+        if longest_match:
+            return self._trie.segment(text, self.token_to_index[self.UNK_TOKEN], self._byte_offset)
+        
+        if legacy:
+            word = self._apply_merges_legacy([char for char in text])
+            return [self.token_to_index.get(token, self.token_to_index[self.UNK_TOKEN]) 
+                    for token in word]
+        
+        # Models with merges across word boundaries can only cache whole texts
+        if not self._word_local:
+            return list(self._encode_cached(text))
+        
+        indices = []
+        for word in split_words(text):
+            indices.extend(self._encode_cached(word))
+        return indices
+    
+    def _encode_cached(self, text: str) -> Tuple[int, ...]:
+        """Encode a word through the LRU cache"""
+        indices = self.cache.get(text)
+        if indices is None:
+            token_to_index = self.token_to_index
+            if self._byte_offset is None:
+                unk = token_to_index[self.UNK_TOKEN]
+                ids = [token_to_index.get(char, unk) for char in text]
+            else:
+                ids = [token_to_index.get(char, -1) for char in text]
+                if -1 in ids:
+                    ids = self._byte_fallback_ids(text, ids)
+            indices = tuple(self._apply_merges(ids))
+            self.cache.put(text, indices)
+        return indices
+    
+    def _byte_fallback_ids(self, text: str, ids: List[int]) -> List[int]:
+        """Replace each unknown character (-1) with the ids of its UTF-8 bytes"""
+        result = []
+        for char, idx in zip(text, ids):
+            if idx == -1:
+                result.extend(self._byte_offset + byte for byte in char.encode('utf-8'))
+            else:
+                result.append(idx)
+        return result
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters of the encode cache"""
+        return self.cache.info()
+    
+    def stats(self) -> Dict:
+        """Return a snapshot of instrumentation, cache and preprocessing stats"""
+        snapshot = self.metrics.snapshot()
+        counters = snapshot['counters']
+        tokens = counters.get('encode.tokens', 0)
+        snapshot['unk_rate'] = counters.get('encode.unk', 0) / tokens if tokens else 0.0
+        snapshot['cache'] = self.cache_info()
+        snapshot['preprocessor'] = preprocessor_metrics.snapshot()
+        if self.memory_report is not None:
+            snapshot['memory'] = self.memory_report
+        return snapshot
+    
+    def _apply_merges(self, ids: List[int]) -> List[int]:
+        """Apply merges by rank to token ids using a linked list and a heap of candidate pairs"""
+        get = self._merge_table.get
+        heappush, heappop = heapq.heappush, heapq.heappop
+        n = len(ids)
+        if n < 2:
+            return ids
+        next_pos = list(range(1, n + 1))
+        next_pos[-1] = -1
+        prev_pos = list(range(-1, n - 1))
+        
+        # Heap entries carry the packed (rank, merged_id) value, which orders by rank
+        values = [get(left << 32 | right) for left, right in zip(ids, ids[1:])]
+        heap = [(value, i) for i, value in enumerate(values) if value is not None]
+        heapq.heapify(heap)
         
+        while heap:
+            value, i = heappop(heap)
+            left = ids[i]
+            j = next_pos[i] if left >= 0 else -1
+            # Ranks are unique per pair, so a mismatch means the entry is stale
+            if j == -1 or get(left << 32 | ids[j]) != value:
+                continue
+            
+            merged = ids[i] = value & _ID_MASK
+            ids[j] = -1
+            after = next_pos[j]
+            next_pos[i] = after
+            if after != -1:
+                prev_pos[after] = i
+                value = get(merged << 32 | ids[after])
+                if value is not None:
+                    heappush(heap, (value, i))
+            before = prev_pos[i]
+            if before != -1:
+                value = get(ids[before] << 32 | merged)
+                if value is not None:
+                    heappush(heap, (value, before))
+        
+        return [idx for idx in ids if idx >= 0]
+    
+    def _apply_merges_legacy(self, word: List[str]) -> List[str]:
+        """Repeatedly apply the leftmost mergeable pair, as the original encoder did"""
         while True:
             pairs = [(word[i], word[i+1]) for i in range(len(word)-1)]
             if not pairs:
@@ -123,8 +766,7 @@ class HindiBPE:
                     word = new_word
                     break
         
-        return [self.token_to_index.get(token, self.token_to_index[self.UNK_TOKEN]) 
-                for token in word]
+        return word
     
     def decode_token(self, token: str, max_depth: int = 100) -> str:
         """Recursively decode a single token with depth limit"""
@@ -134,30 +776,119 @@ class HindiBPE:
         first, second = self.reverse_merges[token]
         return self.decode_token(first, max_depth - 1) + self.decode_token(second, max_depth - 1)
     
-    def decode(self, indices: List[int]) -> str:
-        """Decode indices back to text"""
+    def decode(self, indices: Iterable[int], errors: str = 'skip') -> str:
+        """Decode indices back to text
+        
+        Unknown, out-of-range and <UNK> indices are dropped with errors='skip',
+        become U+FFFD with errors='replace', or raise ValueError with errors='raise'.
+        NumPy arrays, stdlib arrays and memoryviews (such as PackedIds
+        documents) are accepted too. Byte fallback tokens are joined back
+        into UTF-8 text.
+        """
+        if errors not in _DECODE_ERRORS:
+            raise ValueError(f"Unknown errors mode: {errors}")
+        table = self._token_strings
+        indices = _as_int_list(indices)
+        if iter(indices) is indices:
+            indices = list(indices)
+        if self.metrics.enabled:
+            start = time.perf_counter()
+            known = self._token_bytes
+            self.metrics.incr('decode.tokens', len(indices))
+            self.metrics.incr('decode.unknown', sum(1 for idx in indices if idx not in known))
+            text = self._decode(indices, table, errors)
+            self.metrics.observe('decode', time.perf_counter() - start)
+            return text
+        return self._decode(indices, table, errors)
+    
+    def _decode(self, indices: Iterable[int], table: Dict[int, str], errors: str) -> str:
         try:
-            tokens = [self.index_to_token.get(idx, self.UNK_TOKEN) for idx in indices]
-            
-            result = []
-            for token in tokens:
-                if token == self.UNK_TOKEN:
-                    continue
-                decoded = self.decode_token(token)
-                result.append(decoded)
-            
-            return ''.join(result)
-            
-        except Exception as e:
-            print(f"Error during decoding: {e}")
-            return ""
+            return ''.join(map(table.__getitem__, indices))
+        except KeyError:
+            if self._byte_offset is not None:
+                # Byte tokens may split a character, so join everything as
+                # bytes first; invalid byte sequences become U+FFFD
+                return self.decode_to_bytes(indices, errors).decode('utf-8', errors='replace')
+            return ''.join(self._decode_slow(indices, table, errors, '\ufffd'))
+    
+    def decode_to_bytes(self, indices: Iterable[int], errors: str = 'skip') -> bytes:
+        """Decode indices straight to UTF-8 bytes, see decode for errors"""
+        if errors not in _DECODE_ERRORS:
+            raise ValueError(f"Unknown errors mode: {errors}")
+        table = self._token_bytes
+        indices = _as_int_list(indices)
+        if iter(indices) is indices:
+            indices = list(indices)
+        try:
+            return b''.join(map(table.__getitem__, indices))
+        except KeyError:
+            return b''.join(self._decode_slow(indices, table, errors, '\ufffd'.encode('utf-8')))
+    
+    def _decode_slow(self, indices: Iterable[int], table: Dict, errors: str, replacement):
+        """Look up indices one by one, applying the errors policy to unknown ones"""
+        for idx in indices:
+            piece = table.get(idx)
+            if piece is not None:
+                yield piece
+            elif errors == 'replace':
+                yield replacement
+            elif errors == 'raise':
+                raise ValueError(f"Unknown token index: {idx}")
+    
+    def _map_batch(self, method, worker_func, items: Iterable, workers: Optional[int], chunksize: int) -> Iterator:
+        """Map method over items in order, using worker_func in a process pool when workers > 1"""
+        if not workers or workers <= 1:
+            yield from map(method, items)
+            return
+        
+        # The model is handed to each worker once through the initializer
+        # instead of being pickled with every task
+        with multiprocessing.Pool(workers, initializer=_init_batch_worker, initargs=(self,)) as pool:
+            yield from pool.imap(worker_func, items, chunksize=chunksize)
+    
+    def iter_encode(self, texts: Iterable[str], workers: Optional[int] = None, chunksize: int = 256) -> Iterator[List[int]]:
+        """Lazily encode texts in input order, optionally across worker processes"""
+        return self._map_batch(self.encode, _encode_in_worker, texts, workers, chunksize)
+    
+    def iter_decode(self, list_of_indices: Iterable[List[int]], workers: Optional[int] = None, chunksize: int = 256) -> Iterator[str]:
+        """Lazily decode index lists in input order, optionally across worker processes"""
+        return self._map_batch(self.decode, _decode_in_worker, list_of_indices, workers, chunksize)
+    
+    def encode_batch(self, texts: Iterable[str], workers: Optional[int] = None, chunksize: int = 256) -> List[List[int]]:
+        """Encode many texts, preserving input order"""
+        return list(self.iter_encode(texts, workers, chunksize))
+    
+    def decode_batch(self, list_of_indices: Iterable[List[int]], workers: Optional[int] = None, chunksize: int = 256) -> List[str]:
+        """Decode many index lists, preserving input order"""
+        return list(self.iter_decode(list_of_indices, workers, chunksize))
     
     def get_token_mapping(self) -> Dict[int, str]:
         """Return the mapping of indices to tokens"""
         return self.index_to_token
     
-    def save_model(self, path: str = "data/bpe_model.json"):
-        """Save the BPE model's vocabulary and mappings"""
+    def save_model(self, path: str = "data/bpe_model.json", binary: Optional[bool] = None,
+                   include_trie: bool = False):
+        """Save the BPE model's vocabulary and mappings
+        
+        Paths ending in .bin are written in the compact binary format unless
+        binary is given explicitly. include_trie stores the longest-match trie
+        so it does not have to be rebuilt on load.
+        """
+        trie = self._trie if include_trie else None
+        # Models without special tokens, byte fallback or a normalizer are
+        # saved exactly as before
+        config = self._model_config()
+        if not any(config.values()):
+            config = None
+        if binary is None:
+            binary = path.endswith('.bin')
+        if binary:
+            tokens = [self.index_to_token[idx] for idx in range(len(self.index_to_token))]
+            merge_ids = [(self.token_to_index[first], self.token_to_index[second])
+                         for first, second in self.merges]
+            write_binary_model(path, self.vocab_size, tokens, merge_ids, trie, config)
+            return
+        
         model_data = {
             'vocab_size': self.vocab_size,
             'token_to_index': self.token_to_index,
@@ -165,13 +896,19 @@ class HindiBPE:
             'merges': {f"{k[0]}|{k[1]}": v for k, v in self.merges.items()},
             'reverse_merges': {k: f"{v[0]}|{v[1]}" for k, v in self.reverse_merges.items()}
         }
+        if trie is not None:
+            model_data['trie'] = trie.to_dict()
+        if config is not None:
+            model_data['config'] = config
         
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
         with open(path, 'w', encoding='utf-8') as f:
             json.dump(model_data, f, ensure_ascii=False, indent=2)
     
-    def save_encoded_text(self, text: str, indices: List[int], path: str = "data/encoded_texts.json"):
-        """Save encoded text with its tokens and mappings"""
+    def save_encoded_text(self, text: str, indices: List[int], path: str = DEFAULT_HISTORY_PATH):
+        """Append encoded text with its tokens and mappings to the history store"""
         token_mapping = self.get_token_mapping()
         tokens = [token_mapping[idx] for idx in indices]
         
@@ -183,26 +920,32 @@ class HindiBPE:
             'token_mappings': {str(idx): token for idx, token in zip(indices, tokens)}
         }
         
-        # Load existing data if file exists
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                try:
-                    all_encoded_data = json.load(f)
-                except json.JSONDecodeError:
-                    all_encoded_data = {'texts': []}
-        else:
-            all_encoded_data = {'texts': []}
+        # Opening a store sets up its schema, so reuse it across appends
+        history = self._histories.get(path)
+        if history is None:
+            history = self._histories[path] = EncodedHistory(path)
+        history.append(encoded_data)
+            
+    def load_model(self, path: str = "data/bpe_model.json", build_trie: bool = False):
+        """Load the BPE model's vocabulary and mappings
         
-        # Add new encoded text
-        all_encoded_data['texts'].append(encoded_data)
+        Binary models are memory-mapped and their tables are built lazily.
+        build_trie prepares the longest-match trie now instead of on first use.
+        """
+        if is_binary_model(path):
+            model = self._load_binary_model(path)
+            self._rebuild_tables(model.merge_ids)
+            if model.n_trie_nodes:
+                self._set_lazy('_trie', model.trie)
+        else:
+            self._load_json_model(path)
         
-        # Save updated data
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(all_encoded_data, f, ensure_ascii=False, indent=2)
-            
-    def load_model(self, path: str = "data/bpe_model.json"):
-        """Load the BPE model's vocabulary and mappings"""
+        if build_trie:
+            # Accessing the lazy table builds it
+            self._trie
+    
+    def _load_json_model(self, path: str) -> None:
+        """Load every table of a JSON model"""        
         with open(path, 'r', encoding='utf-8') as f:
             model_data = json.load(f)
             
@@ -211,4 +954,29 @@ class HindiBPE:
         self.index_to_token = {int(k): v for k, v in model_data['index_to_token'].items()}
         self.merges = {tuple(k.split('|')): v for k, v in model_data['merges'].items()}
         self.reverse_merges = {k: tuple(v.split('|')) for k, v in model_data['reverse_merges'].items()}
-        self.vocab = set(self.token_to_index.keys()) 
\ No newline at end of file
+        self.vocab = set(self.token_to_index.keys())
+        self._apply_model_config(model_data.get('config', {}))
+        self._rebuild_tables()
+        if 'trie' in model_data:
+            # Close over the trie alone, not the whole parsed model
+            trie_data = model_data['trie']
+            self._set_lazy('_trie', lambda: TokenTrie.from_dict(trie_data))
+    
+    def _load_binary_model(self, path: str) -> BinaryModel:
+        """Register lazy builders for every table of a binary model"""
+        model = BinaryModel(path)
+        self.vocab_size = model.vocab_size
+        self._apply_model_config(model.config())
+        
+        def build_merges():
+            tokens = self.index_to_token
+            return {(tokens[first], tokens[second]): tokens[first] + tokens[second]
+                    for first, second in model.merge_ids()}
+        
+        # Later indices win for duplicate tokens, as they do in fit
+        self._set_lazy('index_to_token', lambda: dict(enumerate(model.tokens())))
+        self._set_lazy('token_to_index', lambda: {token: idx for idx, token in self.index_to_token.items()})
+        self._set_lazy('merges', build_merges)
+        self._set_lazy('reverse_merges', lambda: {token: pair for pair, token in self.merges.items()})
+        self._set_lazy('vocab', lambda: set(self.token_to_index.keys()))
+        return model
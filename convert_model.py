@@ -0,0 +1,39 @@
+from bpe import HindiBPE
+from model_format import is_binary_model
+import argparse
+import time
+
+def convert_model(input_path: str, output_path: str) -> None:
+    """Convert a model between the JSON and binary formats"""
+    bpe = HindiBPE()
+    bpe.load_model(input_path)
+    bpe.save_model(output_path, binary=not is_binary_model(input_path))
+
+def time_cold_load(path: str, repeat: int = 5) -> float:
+    """Return the best time to load a model and encode one sentence"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bpe = HindiBPE()
+        bpe.load_model(path)
+        bpe.encode("भारत एक विशाल देश है")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a BPE model between JSON and binary formats")
+    parser.add_argument('input', help="model to convert (format is detected)")
+    parser.add_argument('output', help="converted model path")
+    parser.add_argument('--compare', action='store_true',
+                        help="report cold-start load times of both files")
+    args = parser.parse_args()
+    
+    convert_model(args.input, args.output)
+    print(f"Converted {args.input} -> {args.output}")
+    
+    if args.compare:
+        for path in (args.input, args.output):
+            print(f"{path}: {time_cold_load(path) * 1000:.1f} ms to load and encode")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+from array import array
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, List, Optional
+import json
+import os
+import sqlite3
+import sys
+
+DEFAULT_HISTORY_PATH = "data/encoded_texts.db"
+LEGACY_HISTORY_PATH = "data/encoded_texts.json"
+# PRAGMA user_version once the legacy JSON history has been considered,
+# and once its entries have been imported
+_LEGACY_CHECKED = 1
+_LEGACY_IMPORTED = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS encoded_texts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    original_text TEXT NOT NULL,
+    indices BLOB NOT NULL,
+    tokens TEXT NOT NULL,
+    token_mappings TEXT NOT NULL
+)
+"""
+
+
+def _pack_indices(indices: List[int]) -> bytes:
+    """Store indices as little-endian uint32, far smaller than JSON text"""
+    values = array('I', indices)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack_indices(value) -> List[int]:
+    # Rows written before indices were packed hold JSON text
+    if isinstance(value, str):
+        return json.loads(value)
+    values = array('I')
+    values.frombytes(value)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tolist()
+
+
+def _read_legacy(json_path: str) -> List[Dict]:
+    """Return the entries of an old encoded_texts.json file, oldest first"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f).get('texts', [])
+        except json.JSONDecodeError:
+            return []
+
+
+class EncodedHistory:
+    """Append-only store of encoded texts backed by SQLite
+
+    Appends are single-row inserts, reads are paginated newest first, and
+    SQLite's write-ahead log lets several app sessions write concurrently.
+    Create one instance per process and reuse it; opening a store sets up
+    the schema and may import the legacy JSON history.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, legacy_path: Optional[str] = LEGACY_HISTORY_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._locked() as conn:
+            if self._user_version(conn) < _LEGACY_CHECKED:
+                # Import the old JSON history into a new, empty database only
+                is_empty = conn.execute("SELECT 1 FROM encoded_texts LIMIT 1").fetchone() is None
+                if is_empty and legacy_path and os.path.exists(legacy_path):
+                    self._import_legacy(conn, legacy_path)
+                else:
+                    conn.execute(f"PRAGMA user_version = {_LEGACY_CHECKED}")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @contextmanager
+    def _locked(self) -> Iterator[sqlite3.Connection]:
+        """Run the block in a transaction holding the write lock
+
+        Sessions opening the store together wait here, so checks of the
+        migration marker and the import that follows are never interleaved.
+        """
+        with closing(self._connect()) as conn:
+            conn.isolation_level = None
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(_SCHEMA)
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _user_version(conn: sqlite3.Connection) -> int:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def _import_legacy(self, conn: sqlite3.Connection, json_path: str) -> int:
+        entries = _read_legacy(json_path)
+        self._insert(conn, entries)
+        conn.execute(f"PRAGMA user_version = {_LEGACY_IMPORTED}")
+        return len(entries)
+
+    def append(self, entry: Dict) -> None:
+        """Append one encoded text entry"""
+        self.extend([entry])
+
+    def extend(self, entries: List[Dict]) -> None:
+        """Append several entries in one transaction"""
+        # The inner with commits, closing releases the connection
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, entries)
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, entries: List[Dict]) -> None:
+        rows = [(entry['original_text'],
+                 _pack_indices(entry['indices']),
+                 json.dumps(entry['tokens'], ensure_ascii=False),
+                 json.dumps(entry['token_mappings'], ensure_ascii=False))
+                for entry in entries]
+        conn.executemany(
+            "INSERT INTO encoded_texts (original_text, indices, tokens, token_mappings) VALUES (?, ?, ?, ?)",
+            rows)
+
+    def recent(self, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Return up to limit entries, newest first, skipping the offset newest"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT original_text, indices, tokens, token_mappings FROM encoded_texts "
+                "ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return [{
+            'original_text': text,
+            'indices': _unpack_indices(indices),
+            'tokens': json.loads(tokens),
+            'token_mappings': json.loads(token_mappings),
+        } for text, indices, tokens, token_mappings in rows]
+
+    def count(self) -> int:
+        """Return the number of stored entries
+
+        Rows are never deleted and AUTOINCREMENT ids leave no gaps, so the
+        largest id is the count, read from the index instead of a full
+        table scan like COUNT(*).
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM encoded_texts").fetchone()[0]
+
+    def migrate_from_json(self, json_path: str = LEGACY_HISTORY_PATH) -> int:
+        """Append all entries of an old encoded_texts.json file, oldest first
+
+        Returns how many entries were imported. A legacy history is only
+        ever imported once, so this returns 0 if opening the store, or an
+        earlier call, already imported one.
+        """
+        with self._locked() as conn:
+            if self._user_version(conn) >= _LEGACY_IMPORTED:
+                return 0
+            return self._import_legacy(conn, json_path)
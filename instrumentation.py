@@ -0,0 +1,133 @@
+from typing import Callable, Dict, List, Optional
+from contextlib import contextmanager
+import functools
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Exporters are called as exporter(name, seconds) for every timed event
+Exporter = Callable[[str, float], None]
+
+
+class Instrumentation:
+    """Counters and timers for hot paths, disabled by default
+
+    Call sites check ``enabled`` before reading the clock, so a disabled
+    instance costs one attribute lookup per call.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, List[float]] = {}
+        self.exporters: List[Exporter] = []
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def add_exporter(self, exporter: Exporter) -> None:
+        """Register a callback that receives every timed event"""
+        self.exporters.append(exporter)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Add amount to a counter"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one timed event and forward it to the exporters"""
+        timer = self.timers.get(name)
+        if timer is None:
+            # [count, total, max]
+            timer = self.timers[name] = [0, 0.0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+        if seconds > timer[2]:
+            timer[2] = seconds
+        for exporter in self.exporters:
+            exporter(name, seconds)
+
+    @contextmanager
+    def timed(self, name: str):
+        """Time a block when enabled"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.timers.clear()
+
+    def snapshot(self) -> Dict:
+        """Return a copy of all counters and timer summaries"""
+        return {
+            'counters': dict(self.counters),
+            'timers': {
+                name: {
+                    'count': count,
+                    'total_seconds': total,
+                    'mean_ms': total / count * 1000 if count else 0.0,
+                    'max_ms': longest * 1000,
+                }
+                for name, (count, total, longest) in self.timers.items()
+            },
+        }
+
+    def __getstate__(self):
+        # Exporters are often closures, so worker processes start without them
+        state = self.__dict__.copy()
+        state['exporters'] = []
+        return state
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of this process in MB, or None if unknown"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def format_stats(stats: Dict, indent: str = "") -> List[str]:
+    """Render a stats snapshot as readable lines"""
+    lines = []
+    for name, value in stats.items():
+        if isinstance(value, dict):
+            nested = format_stats(value, indent + "  ")
+            if nested:
+                lines.append(f"{indent}{name}:")
+                lines.extend(nested)
+        elif isinstance(value, float):
+            lines.append(f"{indent}{name}: {value:.4f}")
+        else:
+            lines.append(f"{indent}{name}: {value}")
+    return lines
+
+
+def timed_method(name: str):
+    """Decorate a method of an object with a ``metrics`` Instrumentation to time its calls"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if not metrics.enabled:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                metrics.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
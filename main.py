@@ -1,26 +1,85 @@
 from download_data import download_hindi_corpus
 from preprocessor import load_and_preprocess_data
+from preprocessor import metrics as preprocessor_metrics
 from bpe import HindiBPE
+from packed_ids import PackedIds, is_packed_ids, write_packed_ids
+from instrumentation import format_stats
+import argparse
 import statistics
 import os
 
-def train_and_save_model():
-    """Train BPE model and save it to file"""
+CHECKPOINT_PATH = "data/bpe_checkpoint.json"
+
+def train_and_save_model(word_level: bool = False, workers: int = 1, vocab_size: int = 5000,
+                         checkpoint_every: int = 1000, resume: bool = False, engine: str = 'python',
+                         min_freq: int = 1, memory_budget_mb: float = None):
+    """Train BPE model and save it to file
+    
+    With word_level=True the corpus is reduced to unique word counts first.
+    With workers > 1 the corpus is preprocessed and counted in parallel.
+    Progress is checkpointed to CHECKPOINT_PATH every checkpoint_every
+    merges, and resume=True continues from the latest checkpoint.
+    engine='numpy' trains with the vectorized NumPy engine. With
+    memory_budget_mb, word-level training keeps the most frequent words
+    that fit the budget and frees the rest before training.
+    """
+    bpe = HindiBPE(vocab_size=vocab_size, instrument=True, min_freq=min_freq)
+    if resume and os.path.exists(CHECKPOINT_PATH):
+        print(f"Resuming training from {CHECKPOINT_PATH} up to vocabulary size {vocab_size}...")
+        bpe.fit(None, checkpoint_path=CHECKPOINT_PATH, checkpoint_every=checkpoint_every, resume=True,
+                engine=engine, memory_budget_mb=memory_budget_mb)
+        bpe.save_model()
+        print("Model saved successfully!")
+        return bpe
+    
     corpus_path = download_hindi_corpus()
-    processed_texts = load_and_preprocess_data(corpus_path)
+    # Worker processes keep their own preprocessing stats, so only
+    # single-process runs report them
+    preprocessor_metrics.enable()
+    processed_texts = load_and_preprocess_data(corpus_path, word_counts=word_level, workers=workers)
     
-    # Initialize and train BPE
-    vocab_size = 5000
-    bpe = HindiBPE(vocab_size=vocab_size)
+    # Train BPE
     print(f"Training BPE with vocabulary size {vocab_size}...")
-    bpe.fit(processed_texts)
+    if word_level:
+        print(f"Training on {len(processed_texts)} unique words...")
+    # Under a memory budget fit takes over the word counts and empties them
+    bpe.fit(processed_texts, checkpoint_path=CHECKPOINT_PATH, checkpoint_every=checkpoint_every,
+            engine=engine, memory_budget_mb=memory_budget_mb)
+    if bpe.memory_report is not None:
+        report = bpe.memory_report
+        print(f"Trained on {report['trained_words']} words; peak RSS {report['peak_rss_mb']} MB "
+              f"of a {report['budget_mb']} MB budget")
+        if report['excluded_words']:
+            print(f"{report['excluded_words']} rarer words ({report['excluded_occurrences']} occurrences) "
+                  f"were excluded from training; the merges may differ from training without a budget")
     
     # Save the model
     bpe.save_model()
     print("Model saved successfully!")
+    
+    print("\nTraining statistics:")
+    print("-" * 50)
+    print("\n".join(format_stats(bpe.stats())))
+    return bpe
+
+def extend_model(vocab_size: int, word_level: bool = False, workers: int = 1,
+                 checkpoint_every: int = 1000, engine: str = 'python', min_freq: int = 1):
+    """Grow the saved model to vocab_size by continuing its training"""
+    corpus_path = download_hindi_corpus()
+    processed_texts = load_and_preprocess_data(corpus_path, word_counts=word_level, workers=workers)
+    
+    bpe = HindiBPE(instrument=True, min_freq=min_freq)
+    bpe.load_model("data/bpe_model.json")
+    print(f"Extending model from {len(bpe.index_to_token)} to {vocab_size} tokens...")
+    bpe.extend(processed_texts, vocab_size, word_level=word_level,
+               checkpoint_path=CHECKPOINT_PATH, checkpoint_every=checkpoint_every, engine=engine)
+    bpe.save_model()
+    print("Model saved successfully!")
     return bpe
 
-def load_or_train_model():
+def load_or_train_model(word_level: bool = False, workers: int = 1, vocab_size: int = 5000,
+                        checkpoint_every: int = 1000, engine: str = 'python', min_freq: int = 1,
+                        memory_budget_mb: float = None):
     """Load existing model or train new one if not exists"""
     model_path = "data/bpe_model.json"
     if os.path.exists(model_path):
@@ -29,7 +88,9 @@ def load_or_train_model():
         print("Loaded existing model.")
         return bpe
     else:
-        return train_and_save_model()
+        return train_and_save_model(word_level=word_level, workers=workers, vocab_size=vocab_size,
+                                    checkpoint_every=checkpoint_every, engine=engine, min_freq=min_freq,
+                                    memory_budget_mb=memory_budget_mb)
 
 def calculate_stats(original_text: str, indices: list, token_mapping: dict) -> dict:
     """Calculate compression statistics"""
@@ -50,9 +111,113 @@ def calculate_stats(original_text: str, indices: list, token_mapping: dict) -> d
         'max_token_length': max(token_lengths) if token_lengths else 0
     }
 
+def encode_file(bpe: HindiBPE, input_path: str, output_path: str, workers: int = 1, packed: bool = False):
+    """Encode a text file line by line, writing space-separated indices per line
+    
+    With packed=True the output is a memory-mappable packed id corpus with
+    one document per line instead (see packed_ids.py).
+    """
+    with open(input_path, 'r', encoding='utf-8') as fin:
+        lines = (line.rstrip('\n') for line in fin)
+        if packed:
+            write_packed_ids(output_path, bpe.iter_encode(lines, workers=workers), len(bpe.index_to_token))
+            return
+        with open(output_path, 'w', encoding='utf-8') as fout:
+            for indices in bpe.iter_encode(lines, workers=workers):
+                fout.write(' '.join(map(str, indices)) + '\n')
+
+def decode_file(bpe: HindiBPE, input_path: str, output_path: str, workers: int = 1):
+    """Decode a file of space-separated indices per line back to text lines
+    
+    Packed id corpora written by encode_file(packed=True) are detected and
+    decoded straight from the memory map.
+    """
+    if is_packed_ids(input_path):
+        corpus = PackedIds(input_path)
+        with open(output_path, 'w', encoding='utf-8') as fout:
+            # Worker processes need picklable lists rather than views
+            documents = (doc.tolist() for doc in corpus) if workers > 1 else iter(corpus)
+            for text in bpe.iter_decode(documents, workers=workers):
+                fout.write(text + '\n')
+        corpus.close()
+        return
+    with open(input_path, 'r', encoding='utf-8') as fin, \
+            open(output_path, 'w', encoding='utf-8') as fout:
+        list_of_indices = ([int(idx) for idx in line.split()] for line in fin)
+        for text in bpe.iter_decode(list_of_indices, workers=workers):
+            fout.write(text + '\n')
+
 def main():
-    # Load or train model
-    bpe = load_or_train_model()
+    parser = argparse.ArgumentParser(description="Train and test the Hindi BPE model")
+    parser.add_argument('--word-level', action='store_true',
+                        help="train on unique word counts instead of whole sentences")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of processes used to preprocess the corpus for training")
+    parser.add_argument('--vocab-size', type=int, default=5000,
+                        help="vocabulary size when a new model is trained")
+    parser.add_argument('--checkpoint-every', type=int, default=1000,
+                        help="merges between training checkpoints")
+    parser.add_argument('--resume', action='store_true',
+                        help="resume an interrupted training run from its checkpoint")
+    parser.add_argument('--extend', action='store_true',
+                        help="grow the existing model to --vocab-size instead of loading it")
+    parser.add_argument('--engine', choices=['python', 'numpy', 'compact'], default='python',
+                        help="training engine; numpy needs NumPy installed, compact uses less memory, "
+                             "all learn the same merges")
+    parser.add_argument('--min-freq', type=int, default=1,
+                        help="never merge pairs seen fewer times than this")
+    parser.add_argument('--memory-budget-mb', type=float, default=None,
+                        help="bound word-level training memory by excluding the rarest words")
+    parser.add_argument('--byte-fallback', action='store_true',
+                        help="add byte tokens so text outside the vocabulary round-trips losslessly")
+    parser.add_argument('--special-tokens', nargs='+', default=[],
+                        help="special tokens to register, e.g. <BOS> <EOS>")
+    subparsers = parser.add_subparsers(dest='command')
+    for command in ('encode', 'decode'):
+        sub = subparsers.add_parser(command, help=f"{command} a file line by line")
+        sub.add_argument('input', help="input file path")
+        sub.add_argument('output', help="output file path")
+        # Own dest, as a subparser default would override the top-level --workers
+        sub.add_argument('--workers', dest='io_workers', type=int, default=os.cpu_count(),
+                         help="number of worker processes (default: all cores)")
+        if command == 'encode':
+            sub.add_argument('--packed', action='store_true',
+                             help="write a packed binary id corpus instead of text")
+    args = parser.parse_args()
+    if args.memory_budget_mb is not None and not args.word_level:
+        parser.error("--memory-budget-mb requires --word-level")
+    
+    # Load, train or extend the model
+    if args.extend:
+        bpe = extend_model(args.vocab_size, word_level=args.word_level, workers=args.workers,
+                           checkpoint_every=args.checkpoint_every, engine=args.engine, min_freq=args.min_freq)
+    elif args.resume:
+        bpe = train_and_save_model(word_level=args.word_level, workers=args.workers,
+                                   vocab_size=args.vocab_size, checkpoint_every=args.checkpoint_every,
+                                   resume=True, engine=args.engine, min_freq=args.min_freq,
+                                   memory_budget_mb=args.memory_budget_mb)
+    else:
+        bpe = load_or_train_model(word_level=args.word_level, workers=args.workers,
+                                  vocab_size=args.vocab_size, checkpoint_every=args.checkpoint_every,
+                                  engine=args.engine, min_freq=args.min_freq,
+                                  memory_budget_mb=args.memory_budget_mb)
+    
+    # Byte and special tokens are appended after the merges, so adding them
+    # to an existing model leaves every other index unchanged
+    new_special_tokens = [token for token in args.special_tokens if token not in bpe.special_tokens]
+    if (args.byte_fallback and not bpe.byte_fallback) or new_special_tokens:
+        if args.byte_fallback:
+            bpe.enable_byte_fallback()
+        bpe.add_special_tokens(new_special_tokens)
+        bpe.save_model()
+        print("Added byte fallback and special tokens to the saved model.")
+    
+    if args.command == 'encode':
+        encode_file(bpe, args.input, args.output, workers=args.io_workers, packed=args.packed)
+        return
+    if args.command == 'decode':
+        decode_file(bpe, args.input, args.output, workers=args.io_workers)
+        return
     
     # Get token mapping
     token_mapping = bpe.get_token_mapping()
@@ -0,0 +1,147 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+import json
+import mmap
+import os
+import struct
+import sys
+
+from trie import TokenTrie
+
+# Binary model layout (little-endian):
+#   header   magic "HBPE", version, vocab_size, n_tokens, n_merges,
+#            n_trie_nodes, n_trie_edges, config_size  (8 x 4 bytes; version 1
+#            has no trie counts, version 2 no config size)
+#   offsets  uint32[n_tokens + 1] byte offsets of each token in the blob
+#   blob     UTF-8 bytes of all tokens in index order, padded to 4 bytes
+#   merges   int32[n_merges * 2] (left_id, right_id) pairs in rank order
+#   trie     int32 node_token[n_nodes], uint32 edge_start[n_nodes + 1],
+#            uint32 edge_char[n_edges], uint32 edge_child[n_edges]
+#            (see trie.TokenTrie; absent when n_trie_nodes is 0)
+#   config   UTF-8 JSON of the encoding settings (special tokens, byte
+#            fallback, normalizer); absent when config_size is 0
+MAGIC = b"HBPE"
+VERSION = 3
+_PREFIX = struct.Struct('<4sI')
+_HEADERS = {
+    1: struct.Struct('<4sIIII'),
+    2: struct.Struct('<4sIIIIII'),
+    3: struct.Struct('<4sIIIIIII'),
+}
+
+
+def _to_little_endian(values: array) -> array:
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def is_binary_model(path: str) -> bool:
+    """Check whether path holds a binary model by its magic bytes"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_binary_model(path: str, vocab_size: int, tokens: List[str],
+                       merge_ids: List[Tuple[int, int]], trie: Optional[TokenTrie] = None,
+                       config: Optional[Dict] = None) -> None:
+    """Write a token table, merge pairs, optional trie and config in the binary model format"""
+    encoded = [token.encode('utf-8') for token in tokens]
+    offsets = array('I', [0])
+    for token in encoded:
+        offsets.append(offsets[-1] + len(token))
+    blob = b''.join(encoded)
+    blob += b'\0' * (-len(blob) % 4)
+    merges = array('i', [idx for pair in merge_ids for idx in pair])
+    n_nodes = len(trie.node_token) if trie is not None else 0
+    n_edges = len(trie.edge_char) if trie is not None else 0
+    config_blob = json.dumps(config, ensure_ascii=False).encode('utf-8') if config else b''
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(_HEADERS[VERSION].pack(MAGIC, VERSION, vocab_size, len(tokens), len(merge_ids),
+                                       n_nodes, n_edges, len(config_blob)))
+        f.write(_to_little_endian(offsets).tobytes())
+        f.write(blob)
+        f.write(_to_little_endian(merges).tobytes())
+        if trie is not None:
+            for typecode, values in (('i', trie.node_token), ('I', trie.edge_start),
+                                     ('I', trie.edge_char), ('I', trie.edge_child)):
+                f.write(_to_little_endian(array(typecode, values)).tobytes())
+        f.write(config_blob)
+
+
+class BinaryModel:
+    """Read-only, memory-mapped view of a binary model file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = _PREFIX.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary BPE model")
+        if version not in _HEADERS:
+            raise ValueError(f"Unsupported binary model version {version} in {path}")
+
+        header = _HEADERS[version]
+        fields = header.unpack_from(self._mm, 0)
+        self.vocab_size, self.n_tokens, self.n_merges = fields[2:5]
+        self.n_trie_nodes, self.n_trie_edges = fields[5:7] if version >= 2 else (0, 0)
+        self.config_size = fields[7] if version >= 3 else 0
+
+        self._offsets_start = header.size
+        self._blob_start = self._offsets_start + 4 * (self.n_tokens + 1)
+        blob_size = self._read_offsets(self.n_tokens, self.n_tokens + 1)[0]
+        self._merges_start = self._blob_start + blob_size + (-blob_size % 4)
+
+    def _read_offsets(self, start: int, stop: int) -> array:
+        offsets = array('I')
+        offsets.frombytes(self._mm[self._offsets_start + 4 * start:self._offsets_start + 4 * stop])
+        return _to_little_endian(offsets)
+
+    def token(self, idx: int) -> str:
+        """Return a single token without decoding the whole table"""
+        begin, end = self._read_offsets(idx, idx + 2)
+        return self._mm[self._blob_start + begin:self._blob_start + end].decode('utf-8')
+
+    def tokens(self) -> List[str]:
+        """Return all tokens in index order"""
+        offsets = self._read_offsets(0, self.n_tokens + 1)
+        blob = self._mm[self._blob_start:self._blob_start + offsets[-1]]
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.n_tokens)]
+
+    def merge_ids(self) -> List[Tuple[int, int]]:
+        """Return (left_id, right_id) merge pairs in rank order"""
+        merges = array('i')
+        merges.frombytes(self._mm[self._merges_start:self._merges_start + 8 * self.n_merges])
+        _to_little_endian(merges)
+        return list(zip(merges[0::2], merges[1::2]))
+
+    def trie(self) -> Optional[TokenTrie]:
+        """Return the stored longest-match trie, or None if the file has none"""
+        if not self.n_trie_nodes:
+            return None
+        position = self._merges_start + 8 * self.n_merges
+        sections = []
+        for typecode, count in (('i', self.n_trie_nodes), ('I', self.n_trie_nodes + 1),
+                                ('I', self.n_trie_edges), ('I', self.n_trie_edges)):
+            values = array(typecode)
+            values.frombytes(self._mm[position:position + 4 * count])
+            sections.append(_to_little_endian(values))
+            position += 4 * count
+        return TokenTrie(*sections)
+
+    def config(self) -> Dict:
+        """Return the stored encoding settings, empty if the file has none"""
+        if not self.config_size:
+            return {}
+        position = self._merges_start + 8 * self.n_merges
+        if self.n_trie_nodes:
+            position += 4 * (2 * self.n_trie_nodes + 1 + 2 * self.n_trie_edges)
+        return json.loads(self._mm[position:position + self.config_size].decode('utf-8'))
+
+    def close(self) -> None:
+        self._mm.close()
@@ -0,0 +1,86 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import unicodedata
+
+# Code point ranges of the character classes a Normalizer can keep
+CHAR_CLASSES: Dict[str, List[Tuple[int, int]]] = {
+    'devanagari': [(0x0900, 0x097F)],
+    'devanagari_extended': [(0xA8E0, 0xA8FF), (0x1CD0, 0x1CFF)],
+    'digits': [(0x30, 0x39)],
+    'latin': [(0x41, 0x5A), (0x61, 0x7A)],
+    'punctuation': [(0x21, 0x2F), (0x3A, 0x40), (0x5B, 0x60), (0x7B, 0x7E), (0x2010, 0x2027)],
+    'space': [(0x20, 0x20)],
+}
+
+# Devanagari digits ०-९ to ASCII 0-9, usable as Normalizer(replace=...)
+DEVANAGARI_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+
+class _TranslateTable(dict):
+    """str.translate table that computes code points outside the precompiled
+    ranges on first use and caches them like any precompiled entry"""
+
+    def __init__(self, normalizer: "Normalizer"):
+        super().__init__()
+        self._normalizer = normalizer
+
+    def __missing__(self, codepoint: int) -> Optional[str]:
+        value = self[codepoint] = self._normalizer._translate(codepoint)
+        return value
+
+
+class Normalizer:
+    """Unicode normalization plus character mapping, applied before encoding
+
+    The text is brought to the given normalization form (NFC by default),
+    then a single str.translate pass applies replace, maps Unicode
+    whitespace to a space when whitespace=True, and, when keep names
+    classes from CHAR_CLASSES, drops every other character. With the
+    defaults only NFC is applied. Anything dropped or replaced cannot be
+    recovered by decode, so byte fallback alone is what makes encoding
+    lossless.
+    """
+
+    def __init__(self, form: Optional[str] = 'NFC', keep: Optional[Iterable[str]] = None,
+                 replace: Optional[Dict[str, str]] = None, whitespace: bool = False):
+        self.form = form
+        self.keep = sorted(keep) if keep is not None else None
+        self.replace = dict(replace or {})
+        self.whitespace = whitespace
+        for name in self.keep or ():
+            if name not in CHAR_CLASSES:
+                raise ValueError(f"Unknown character class: {name}")
+        self._ranges = [span for name in self.keep or () for span in CHAR_CLASSES[name]]
+
+        # Precompile the table for every character that is replaced or kept,
+        # anything else is filled in on first use
+        self._table = _TranslateTable(self)
+        for char in self.replace:
+            self._table[ord(char)]
+        for start, end in self._ranges:
+            for codepoint in range(start, end + 1):
+                self._table[codepoint]
+        self._identity = self.keep is None and not self.replace and not whitespace
+
+    def _translate(self, codepoint: int) -> Optional[str]:
+        char = chr(codepoint)
+        if char in self.replace:
+            return self.replace[char]
+        if self.whitespace and char.isspace():
+            return ' '
+        if self.keep is None or any(start <= codepoint <= end for start, end in self._ranges):
+            return char
+        return None
+
+    def __call__(self, text: str) -> str:
+        if self.form and not unicodedata.is_normalized(self.form, text):
+            text = unicodedata.normalize(self.form, text)
+        if self._identity:
+            return text
+        return text.translate(self._table)
+
+    def to_dict(self) -> Dict:
+        return {'form': self.form, 'keep': self.keep, 'replace': self.replace, 'whitespace': self.whitespace}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Normalizer":
+        return cls(data.get('form'), data.get('keep'), data.get('replace'), data.get('whitespace', False))
@@ -0,0 +1,148 @@
+from array import array
+from typing import Iterable, Iterator, Sequence, Union
+import mmap
+import os
+import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, stdlib arrays are used without it
+    np = None
+
+# Packed token id corpus layout (little-endian):
+#   header   magic "HBPI", version, itemsize (2 or 4), vocab_size,
+#            n_docs (uint64), n_ids (uint64)
+#   ids      uint16 or uint32[n_ids], every document back to back,
+#            padded to 8 bytes
+#   offsets  uint64[n_docs + 1]; document i is ids[offsets[i]:offsets[i + 1]]
+MAGIC = b"HBPI"
+VERSION = 1
+_HEADER = struct.Struct('<4sIIIQQ')
+_TYPECODES = {2: 'H', 4: 'I'}
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def id_itemsize(vocab_size: int) -> int:
+    """Return the bytes needed per id: 2 up to 65536 tokens, else 4"""
+    return 2 if vocab_size <= 1 << 16 else 4
+
+
+def to_id_array(indices: Sequence[int], vocab_size: int):
+    """Pack indices into a uint16/uint32 NumPy array, or a stdlib array without NumPy"""
+    itemsize = id_itemsize(vocab_size)
+    if np is not None:
+        return np.array(indices, dtype=np.uint16 if itemsize == 2 else np.uint32)
+    return array(_TYPECODES[itemsize], indices)
+
+
+def is_packed_ids(path: str) -> bool:
+    """Check whether path holds a packed id corpus by its magic bytes"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_packed_ids(path: str, list_of_indices: Iterable[Sequence[int]], vocab_size: int) -> int:
+    """Stream documents of token ids into a packed file and return how many were written
+
+    Only the offsets are kept in memory, so list_of_indices may be a
+    generator such as HindiBPE.iter_encode.
+    """
+    itemsize = id_itemsize(vocab_size)
+    typecode = _TYPECODES[itemsize]
+    offsets = array('Q', [0])
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        for indices in list_of_indices:
+            ids = array(typecode, indices)
+            if not _LITTLE_ENDIAN:
+                ids.byteswap()
+            f.write(ids.tobytes())
+            offsets.append(offsets[-1] + len(ids))
+        n_ids = offsets[-1]
+        f.write(b'\0' * (-(n_ids * itemsize) % 8))
+        if not _LITTLE_ENDIAN:
+            offsets.byteswap()
+        f.write(offsets.tobytes())
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, itemsize, vocab_size, len(offsets) - 1, n_ids))
+    return len(offsets) - 1
+
+
+class PackedIds:
+    """Read-only, memory-mapped view of a packed id corpus
+
+    Documents are returned as memoryviews straight into the mapping, so
+    slicing copies nothing and HindiBPE.decode accepts them directly.
+    Release any views before calling close.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.itemsize, self.vocab_size, self.n_docs, self.n_ids = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a packed id corpus")
+        if version != VERSION:
+            raise ValueError(f"Unsupported packed id corpus version {version} in {path}")
+
+        self.typecode = _TYPECODES[self.itemsize]
+        self._ids_start = _HEADER.size
+        ids_size = self.n_ids * self.itemsize
+        self._offsets_start = self._ids_start + ids_size + (-ids_size % 8)
+        self.offsets = self._view(self._offsets_start, self.n_docs + 1, 'Q')
+
+    def _view(self, start: int, count: int, typecode: str) -> Union[memoryview, array]:
+        size = array(typecode).itemsize
+        if _LITTLE_ENDIAN:
+            return memoryview(self._mm)[start:start + count * size].cast(typecode)
+        values = array(typecode)
+        values.frombytes(self._mm[start:start + count * size])
+        values.byteswap()
+        return values
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def __getitem__(self, i: int) -> Union[memoryview, array]:
+        """Return the ids of document i without copying them"""
+        if i < 0:
+            i += self.n_docs
+        if not 0 <= i < self.n_docs:
+            raise IndexError("document index out of range")
+        begin, end = self.offsets[i], self.offsets[i + 1]
+        return self._view(self._ids_start + begin * self.itemsize, end - begin, self.typecode)
+
+    def __iter__(self) -> Iterator[Union[memoryview, array]]:
+        for i in range(self.n_docs):
+            yield self[i]
+
+    def ids(self) -> Union[memoryview, array]:
+        """Return the ids of all documents as one flat view"""
+        return self._view(self._ids_start, self.n_ids, self.typecode)
+
+    def to_numpy(self):
+        """Return (ids, offsets) as NumPy arrays backed by the mapping"""
+        if np is None:
+            raise ImportError("numpy is required for PackedIds.to_numpy")
+        ids = np.frombuffer(self._mm, dtype='<u2' if self.itemsize == 2 else '<u4',
+                            count=self.n_ids, offset=self._ids_start)
+        offsets = np.frombuffer(self._mm, dtype='<u8', count=self.n_docs + 1, offset=self._offsets_start)
+        return ids, offsets
+
+    def close(self) -> None:
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        self._mm.close()
+
+    def __enter__(self) -> "PackedIds":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
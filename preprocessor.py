@@ -1,21 +1,58 @@
 import re
-from typing import List, Generator
+import codecs
+import io
+import multiprocessing
+import os
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Generator, Tuple, Union
+
+from instrumentation import Instrumentation
+
+# Preprocessing counters and timers, disabled until metrics.enable() is called
+metrics = Instrumentation()
+
+_WIKI_PATTERNS = [
+    re.compile(r'<[^>]+>'),
+    re.compile(r'\{\{[^\}]+\}\}'),
+    re.compile(r'\[\[[^\]]+\]\]'),
+    re.compile(r'\{\|[^\}]+\|\}'),
+]
+
+# One pass over the text after wiki cleanup. Runs of whitespace, URLs and
+# Latin letters/digits collapse to a single space if they contain whitespace
+# (those characters used to be removed before whitespace was normalized).
+# Any other character outside the Devanagari block is deleted on its own,
+# as it used to be after normalization.
+_CLEANUP = re.compile(r'((?:\s|http\S+|www.\S+|[A-Za-z0-9])+)|[^\u0900-\u097F\s]')
+_WHITESPACE = re.compile(r'\s')
+_SENTENCE_END = re.compile(r'[।\n]')
+_WORD = re.compile(r' ?[^ ]+| ')
+
+def _cleanup_match(match: "re.Match") -> str:
+    run = match.group(1)
+    return ' ' if run and _WHITESPACE.search(run) else ''
 
 def clean_wiki_text(text: str) -> str:
     """Remove Wikipedia markup and extract plain text"""
-    text = re.sub(r'<[^>]+>', ' ', text)
-    text = re.sub(r'\{\{[^\}]+\}\}', ' ', text)
-    text = re.sub(r'\[\[[^\]]+\]\]', ' ', text)
-    text = re.sub(r'\{\|[^\}]+\|\}', ' ', text)
+    for pattern in _WIKI_PATTERNS:
+        text = pattern.sub(' ', text)
     return text
 
 def preprocess_hindi_text(text: str) -> str:
     """Preprocess Hindi text by removing unnecessary characters and normalizing"""
+    if metrics.enabled:
+        start = time.perf_counter()
+        result = _preprocess(text)
+        metrics.observe('preprocess', time.perf_counter() - start)
+        metrics.incr('preprocess.chars_in', len(text))
+        metrics.incr('preprocess.chars_out', len(result))
+        return result
+    return _preprocess(text)
+
+def _preprocess(text: str) -> str:
     text = clean_wiki_text(text)
-    text = re.sub(r'http\S+|www.\S+', '', text)
-    text = re.sub(r'[A-Za-z0-9]', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^\u0900-\u097F\s]', '', text)
+    text = _CLEANUP.sub(_cleanup_match, text)
     return text.strip()
 
 def read_file_in_chunks(file_path: str, chunk_size: int = 10240) -> Generator[str, None, None]:
@@ -27,12 +64,105 @@ def read_file_in_chunks(file_path: str, chunk_size: int = 10240) -> Generator[st
                 break
             yield chunk
 
-def load_and_preprocess_data(file_path: str) -> List[str]:
-    """Load and preprocess the Hindi corpus in chunks"""
-    processed_texts = []
-    for chunk in read_file_in_chunks(file_path):
-        # Split into sentences (roughly)
-        texts = re.split(r'[।\n]', chunk)
-        # Preprocess each line
-        processed_texts.extend(preprocess_hindi_text(text) for text in texts if text.strip())
-    return processed_texts 
\ No newline at end of file
+def split_words(text: str) -> List[str]:
+    """Split text into words, keeping each separating space as a prefix marker"""
+    return _WORD.findall(text)
+
+def count_words(texts: Iterable[str]) -> Dict[str, int]:
+    """Count unique words across texts in first-seen order"""
+    counts = Counter()
+    for text in texts:
+        counts.update(split_words(text))
+    return counts
+
+def _split_sentences(chunks: Iterable[str]) -> Iterator[str]:
+    """Split chunks on danda/newline, carrying partial sentences across chunks"""
+    pending = ''
+    for chunk in chunks:
+        parts = _SENTENCE_END.split(pending + chunk)
+        # The last part may continue in the next chunk
+        pending = parts.pop()
+        yield from parts
+    yield pending
+
+def iter_sentences(file_path: str, chunk_size: int = 10240) -> Iterator[str]:
+    """Yield raw sentences split on danda/newline, carrying partial ones across chunks"""
+    return _split_sentences(read_file_in_chunks(file_path, chunk_size))
+
+def iter_preprocessed(file_path: str, chunk_size: int = 10240) -> Iterator[str]:
+    """Lazily yield preprocessed sentences of the Hindi corpus"""
+    for text in iter_sentences(file_path, chunk_size):
+        if text.strip():
+            yield preprocess_hindi_text(text)
+
+def shard_file(file_path: str, num_shards: int) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that each end right after a newline"""
+    size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, 'rb') as f:
+        for i in range(1, num_shards):
+            target = max(size * i // num_shards, boundaries[-1])
+            f.seek(target)
+            # Move the boundary to just after the next newline
+            if target > 0:
+                f.readline()
+            boundaries.append(min(f.tell(), size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def read_range_in_chunks(file_path: str, start: int, end: int,
+                         chunk_size: int = 10240) -> Generator[str, None, None]:
+    """Read a byte range of a file as text in chunks, translating newlines like open()"""
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield decoder.decode(data)
+        yield decoder.decode(b'', final=True)
+
+def _preprocess_shard(args: Tuple[str, int, int, bool]) -> Union[List[str], Dict[str, int]]:
+    """Preprocess one shard and return its sentences or word counts"""
+    file_path, start, end, word_counts = args
+    texts = (preprocess_hindi_text(text)
+             for text in _split_sentences(read_range_in_chunks(file_path, start, end))
+             if text.strip())
+    if word_counts:
+        return count_words(texts)
+    return list(texts)
+
+def preprocess_parallel(file_path: str, workers: int,
+                        word_counts: bool = False) -> Union[List[str], Dict[str, int]]:
+    """Preprocess line-aligned shards of a file in a process pool
+    
+    Shards are combined in file order, so sentences and word counts (including
+    their first-seen order) are identical to a single-process run.
+    """
+    shards = [(file_path, start, end, word_counts) for start, end in shard_file(file_path, workers)]
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(_preprocess_shard, shards)
+    
+    if word_counts:
+        counts = Counter()
+        for shard_counts in results:
+            counts.update(shard_counts)
+        return counts
+    return [text for shard_texts in results for text in shard_texts]
+
+def load_and_preprocess_data(file_path: str, word_counts: bool = False,
+                             workers: int = 1) -> Union[List[str], Dict[str, int]]:
+    """Load and preprocess the Hindi corpus in chunks
+    
+    With word_counts=True, return unique word frequencies instead of sentences,
+    without holding the processed corpus in memory. With workers > 1, shards
+    of the file are processed in parallel.
+    """
+    if workers > 1:
+        return preprocess_parallel(file_path, workers, word_counts)
+    if word_counts:
+        return count_words(iter_preprocessed(file_path))
+    return list(iter_preprocessed(file_path))
@@ -0,0 +1,182 @@
+from bpe import HindiBPE
+from main import calculate_stats
+from preprocessor import load_and_preprocess_data
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+CORPUS_PATH = "data/hindi_corpus.txt"
+
+def token_usage(bpe: HindiBPE, texts: Iterable[str]) -> Counter:
+    """Count how often every token id is emitted when encoding texts"""
+    counts = Counter()
+    for text in texts:
+        counts.update(bpe.encode(text))
+    return counts
+
+def merge_usage(bpe: HindiBPE, token_counts: Dict[int, int]) -> Dict[Tuple[str, str], int]:
+    """Count how often every merge fires to produce token_counts
+
+    Each emitted token fired every merge of its derivation once, so counts
+    are pushed from merged tokens down to their parts in reverse rank order.
+    A token built by more than one merge is credited to the last of them.
+    A merge is never used more often than the merges it builds on.
+    """
+    produced = Counter()
+    for idx, count in token_counts.items():
+        produced[bpe.index_to_token[idx]] += count
+    usage = {}
+    for pair in reversed(list(bpe.merges)):
+        count = usage[pair] = produced.pop(bpe.merges[pair], 0)
+        if count:
+            produced[pair[0]] += count
+            produced[pair[1]] += count
+    return {pair: usage[pair] for pair in bpe.merges}
+
+def select_merges(bpe: HindiBPE, usage: Dict[Tuple[str, str], int], vocab_size: Optional[int] = None,
+                  min_count: int = 1, max_token_length: Optional[int] = None) -> List[Tuple[str, str]]:
+    """Pick the merges to keep, most used first
+
+    Merges used fewer than min_count times or building tokens longer than
+    max_token_length are dropped. With vocab_size, only the most used of
+    the rest are kept so that the pruned model has about that many tokens.
+    Ties keep the earlier merge, so no merge is picked before its parts.
+    """
+    ranks = {pair: rank for rank, pair in enumerate(bpe.merges)}
+    candidates = [pair for pair, token in bpe.merges.items()
+                  if usage.get(pair, 0) >= min_count
+                  and (max_token_length is None or len(token) <= max_token_length)]
+    candidates.sort(key=lambda pair: (-usage.get(pair, 0), ranks[pair]))
+    if vocab_size is not None:
+        # Characters, <UNK>, special and byte tokens are always kept
+        base_tokens = len(bpe.index_to_token) - len(bpe.merges)
+        candidates = candidates[:max(vocab_size - base_tokens, 0)]
+    return sorted(candidates, key=ranks.__getitem__)
+
+def model_sizes(bpe: HindiBPE) -> Dict[str, int]:
+    """Return the size in bytes of the model saved as JSON and as binary"""
+    with tempfile.TemporaryDirectory() as directory:
+        sizes = {}
+        for name in ('json', 'bin'):
+            path = os.path.join(directory, f"model.{name}")
+            bpe.save_model(path)
+            sizes[f"{name}_bytes"] = os.path.getsize(path)
+        return sizes
+
+def evaluate(bpe: HindiBPE, texts: List[str]) -> Dict:
+    """Measure compression, encode throughput and size of a model on texts
+
+    The compression ratio is the mean of calculate_stats over the
+    non-empty texts, as main.py reports it. Encoding starts from a cleared
+    cache.
+    """
+    bpe.cache.clear()
+    start = time.perf_counter()
+    encoded = [bpe.encode(text) for text in texts]
+    seconds = time.perf_counter() - start
+
+    token_mapping = bpe.get_token_mapping()
+    ratios = [calculate_stats(text, indices, token_mapping)['compression_ratio']
+              for text, indices in zip(texts, encoded) if text]
+    chars = sum(len(text) for text in texts)
+    report = {
+        'tokens': len(bpe.index_to_token),
+        'merges': len(bpe.merges),
+        'compression_ratio': statistics.mean(ratios) if ratios else 0.0,
+        'encoded_tokens': sum(len(indices) for indices in encoded),
+        'encode_chars_per_sec': chars / seconds if seconds else 0.0,
+    }
+    report.update(model_sizes(bpe))
+    return report
+
+def usage_summary(bpe: HindiBPE, token_counts: Counter,
+                  usage: Dict[Tuple[str, str], int]) -> Dict:
+    """Summarize how much of the vocabulary the reference corpus uses"""
+    lengths = [len(token) for token in bpe.merges.values()]
+    return {
+        'tokens': len(bpe.index_to_token),
+        'tokens_emitted': sum(1 for idx in bpe.index_to_token if token_counts.get(idx)),
+        'merges': len(bpe.merges),
+        'merges_unused': sum(1 for count in usage.values() if not count),
+        'max_token_length': max(lengths) if lengths else 0,
+        'most_used_tokens': [(bpe.index_to_token[idx], count) for idx, count in token_counts.most_common(10)],
+    }
+
+def cutoff_report(bpe: HindiBPE, texts: List[str], usage: Dict[Tuple[str, str], int],
+                  cutoffs: Iterable[int], min_count: int = 1,
+                  max_token_length: Optional[int] = None) -> List[Dict]:
+    """Evaluate the full model and a pruned model for every vocab cutoff"""
+    rows = [dict(evaluate(bpe, texts), cutoff=None)]
+    for cutoff in cutoffs:
+        pruned, _ = bpe.prune(select_merges(bpe, usage, cutoff, min_count, max_token_length))
+        rows.append(dict(evaluate(pruned, texts), cutoff=cutoff))
+    return rows
+
+def format_cutoffs(rows: List[Dict]) -> List[str]:
+    """Render a cutoff report as an aligned table"""
+    lines = [f"{'cutoff':>8} {'tokens':>7} {'merges':>7} {'ratio':>6} {'chars/s':>10} {'json KB':>8} {'bin KB':>7}"]
+    for row in rows:
+        cutoff = 'full' if row['cutoff'] is None else row['cutoff']
+        lines.append(f"{cutoff:>8} {row['tokens']:>7} {row['merges']:>7} {row['compression_ratio']:>6.2f} "
+                     f"{row['encode_chars_per_sec']:>10.0f} {row['json_bytes'] / 1024:>8.1f} "
+                     f"{row['bin_bytes'] / 1024:>7.1f}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyze token and merge usage on a reference corpus and write a pruned, re-indexed model")
+    parser.add_argument('model', help="model to analyze (format is detected)")
+    parser.add_argument('output', nargs='?',
+                        help="write the pruned model here (.bin for the binary format)")
+    parser.add_argument('--corpus', default=CORPUS_PATH, help="reference corpus to tokenize")
+    parser.add_argument('--vocab-size', type=int, default=None,
+                        help="keep the most used merges up to about this many tokens")
+    parser.add_argument('--min-count', type=int, default=1,
+                        help="drop merges used fewer times than this on the corpus")
+    parser.add_argument('--max-token-length', type=int, default=None,
+                        help="drop merges building tokens longer than this many characters")
+    parser.add_argument('--cutoffs', type=int, nargs='*', default=[],
+                        help="vocab sizes to compare by compression, encode speed and model size")
+    parser.add_argument('--id-map', help="write the old -> new id map of the pruned model as JSON")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    bpe = HindiBPE()
+    bpe.load_model(args.model)
+    texts = load_and_preprocess_data(args.corpus)
+    token_counts = token_usage(bpe, texts)
+    usage = merge_usage(bpe, token_counts)
+    report = {'usage': usage_summary(bpe, token_counts, usage)}
+    if args.cutoffs:
+        report['cutoffs'] = cutoff_report(bpe, texts, usage, args.cutoffs, args.min_count,
+                                          args.max_token_length)
+
+    if args.output:
+        pruned, id_map = bpe.prune(select_merges(bpe, usage, args.vocab_size, args.min_count,
+                                                 args.max_token_length))
+        pruned.save_model(args.output)
+        report['pruned'] = {'path': args.output, 'tokens': len(pruned.index_to_token),
+                            'merges': len(pruned.merges)}
+        if args.id_map:
+            with open(args.id_map, 'w', encoding='utf-8') as f:
+                json.dump({str(old): new for old, new in id_map.items()}, f)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    for name, value in report['usage'].items():
+        print(f"{name}: {value}")
+    if 'cutoffs' in report:
+        print()
+        print("\n".join(format_cutoffs(report['cutoffs'])))
+    if 'pruned' in report:
+        pruned = report['pruned']
+        print(f"\nWrote {pruned['path']} with {pruned['tokens']} tokens and {pruned['merges']} merges")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+from bpe import HindiBPE
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+
+# Model used by pool workers, set once per process by the pool initializer
+_worker_model: Optional[HindiBPE] = None
+
+
+def _init_worker(model: HindiBPE) -> None:
+    global _worker_model
+    _worker_model = model
+
+
+def _encode_texts(texts: List[str]) -> List[List[int]]:
+    return [_worker_model.encode(text) for text in texts]
+
+
+def _decode_indices(list_of_indices: List[List[int]]) -> List[str]:
+    return [_worker_model.decode(indices) for indices in list_of_indices]
+
+
+class MicroBatcher:
+    """Collect concurrent single requests and run them as one batch
+
+    The first request of a batch waits at most ``window`` seconds for others
+    to join, and a batch never grows beyond ``max_batch`` items.
+    """
+
+    def __init__(self, executor: Executor, func, window: float = 0.005, max_batch: int = 256):
+        self.executor = executor
+        self.func = func
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[object, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks, so running batches live here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[object, asyncio.Future]]) -> None:
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, self.func, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class TokenizerServer:
+    """Minimal asyncio HTTP/1.1 JSON server around one loaded HindiBPE
+
+    Endpoints (POST, JSON bodies):
+      /encode        {"text": str}              -> {"indices": [int]}
+      /decode        {"indices": [int]}         -> {"text": str}
+      /encode_batch  {"texts": [str]}           -> {"indices": [[int]]}
+      /decode_batch  {"indices": [[int]]}       -> {"texts": [str]}
+    and GET /health. Tokenization runs in a process pool (a thread when
+    workers is 0), so the event loop only parses and routes requests.
+    Batch endpoints split their items into one chunk per worker.
+    """
+
+    max_body = 16 * 1024 * 1024
+
+    def __init__(self, bpe: HindiBPE, workers: int = 1, window: float = 0.005, max_batch: int = 256):
+        self.bpe = bpe
+        self.workers = max(workers, 1)
+        if workers > 0:
+            # Spawned workers, unlike forked ones, do not inherit open client
+            # sockets, which would otherwise keep closed connections alive
+            self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=_init_worker, initargs=(bpe,))
+        else:
+            _init_worker(bpe)
+            self.executor = ThreadPoolExecutor(1)
+        self.encoder = MicroBatcher(self.executor, _encode_texts, window, max_batch)
+        self.decoder = MicroBatcher(self.executor, _decode_indices, window, max_batch)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8000) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                version = 'HTTP/1.0'
+                # Until the body is consumed, the next request cannot be found
+                body_read = False
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError("negative Content-Length")
+                    if length > self.max_body:
+                        raise HTTPError(413, "Request body too large")
+                    body = await reader.readexactly(length) if length else b''
+                    body_read = True
+                    status, payload = 200, await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': e.message}
+                except ValueError:
+                    status, payload = 400, {'error': "Malformed request"}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+
+                keep_alive = (body_read and headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _write_response(self, writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+    async def _run_chunked(self, func: Callable[[List], List], items: List) -> List:
+        """Run func over items in one chunk per worker and join the results in order"""
+        loop = asyncio.get_running_loop()
+        size = max(1, -(-len(items) // self.workers))
+        chunks = [items[start:start + size] for start in range(0, len(items), size)]
+        results = await asyncio.gather(*(loop.run_in_executor(self.executor, func, chunk) for chunk in chunks))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def _route(self, method: str, path: str, body: bytes) -> Dict:
+        if path == '/health':
+            return {'status': 'ok'}
+        if path not in ('/encode', '/decode', '/encode_batch', '/decode_batch'):
+            raise HTTPError(404, f"Unknown endpoint: {path}")
+        if method != 'POST':
+            raise HTTPError(405, "Use POST")
+
+        try:
+            data = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(400, "Body must be JSON") from None
+
+        try:
+            if path == '/encode':
+                return {'indices': await self.encoder.submit(str(data['text']))}
+            if path == '/decode':
+                return {'text': await self.decoder.submit([int(idx) for idx in data['indices']])}
+            if path == '/encode_batch':
+                texts = [str(text) for text in data['texts']]
+                return {'indices': await self._run_chunked(_encode_texts, texts)}
+            list_of_indices = [[int(idx) for idx in indices] for indices in data['indices']]
+            return {'texts': await self._run_chunked(_decode_indices, list_of_indices)}
+        except (KeyError, TypeError) as e:
+            raise HTTPError(400, f"Invalid request body: {e}") from None
+
+
+async def serve(model_path: str, host: str, port: int, workers: int, window: float) -> None:
+    bpe = HindiBPE()
+    bpe.load_model(model_path)
+    server = TokenizerServer(bpe, workers=workers, window=window)
+    http_server = await server.start(host, port)
+    print(f"Serving {model_path} on http://{host}:{port} with {workers} workers")
+    try:
+        async with http_server:
+            await http_server.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Hindi BPE encode/decode over HTTP")
+    parser.add_argument('--model', default="data/bpe_model.json", help="model file (JSON or binary)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="tokenizer processes, 0 to tokenize in a thread")
+    parser.add_argument('--batch-window', type=float, default=0.005,
+                        help="seconds a request waits for others to batch with")
+    args = parser.parse_args()
+    asyncio.run(serve(args.model, args.host, args.port, args.workers, args.batch_window))
+
+
+if __name__ == "__main__":
+    main()
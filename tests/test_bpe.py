@@ -0,0 +1,133 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+from bpe import HindiBPE
+from instrumentation import peak_rss_mb
+from normalizer import Normalizer
+from preprocessor import count_words
+
+TEXTS = [
+    "भारत एक विशाल देश है",
+    "भारत की संस्कृति बहुत पुरानी है",
+    "हिंदी भारत की राजभाषा है",
+    "दिल्ली भारत की राजधानी है",
+]
+
+
+class RefitTest(unittest.TestCase):
+    def test_refit_loaded_byte_fallback_model(self):
+        bpe = HindiBPE(vocab_size=60, byte_fallback=True)
+        bpe.fit(TEXTS)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.json")
+            bpe.save_model(path)
+            loaded = HindiBPE(vocab_size=80)
+            loaded.load_model(path)
+
+        loaded.fit(TEXTS)
+        self.assertEqual(loaded._byte_offset, len(loaded.index_to_token) - 256)
+        for text in TEXTS + ["abc 😀"]:
+            self.assertEqual(loaded.decode(loaded.encode(text)), text)
+
+    def test_fit_twice(self):
+        bpe = HindiBPE(vocab_size=60, byte_fallback=True)
+        bpe.fit(TEXTS[:2])
+        bpe.fit(TEXTS)
+        for text in TEXTS:
+            self.assertEqual(bpe.decode(bpe.encode(text)), text)
+
+
+class NormalizedTrainingTest(unittest.TestCase):
+    # Precomposed QA, which NFC decomposes into KA plus nukta
+    WORD = "\u0958\u093e\u0928\u0942\u0928"
+
+    def test_fit_trains_on_normalized_text(self):
+        for texts in ([" ".join([self.WORD] * 3)] * 5, {self.WORD: 5}):
+            bpe = HindiBPE(vocab_size=40, normalizer=Normalizer(), byte_fallback=True)
+            bpe.fit(texts)
+            self.assertEqual(len(bpe.encode(self.WORD)), 1)
+            self.assertEqual(bpe.decode(bpe.encode(self.WORD)), Normalizer()(self.WORD))
+
+    def test_word_counts_that_normalize_alike_are_merged(self):
+        bpe = HindiBPE(vocab_size=40, normalizer=Normalizer())
+        words, weights = bpe._prepare_corpus({self.WORD: 2, Normalizer()(self.WORD): 3}, True)
+        self.assertEqual((words, weights), ([Normalizer()(self.WORD)], [5]))
+
+    def test_extend_trains_on_normalized_text(self):
+        bpe = HindiBPE(vocab_size=10, normalizer=Normalizer(), byte_fallback=True)
+        bpe.fit(TEXTS)
+        bpe.extend([self.WORD] * 5, vocab_size=60)
+        self.assertEqual(len(bpe.encode(self.WORD)), 1)
+
+
+class DecodeErrorsTest(unittest.TestCase):
+    def test_unknown_errors_mode_raises_on_fast_path(self):
+        bpe = HindiBPE(vocab_size=60)
+        bpe.fit(TEXTS)
+        indices = bpe.encode(TEXTS[0])
+        with self.assertRaises(ValueError):
+            bpe.decode(indices, errors='bogus')
+        with self.assertRaises(ValueError):
+            bpe.decode_to_bytes(indices, errors='bogus')
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    def test_budget_below_process_memory_raises(self):
+        bpe = HindiBPE(vocab_size=60)
+        with self.assertRaises(ValueError):
+            bpe.fit(TEXTS, word_level=True, memory_budget_mb=0.01)
+        self.assertEqual(bpe.merges, {})
+
+    def test_word_counts_are_released_before_training(self):
+        counts = count_words(TEXTS)
+        expected = HindiBPE(vocab_size=60)
+        expected.fit(dict(counts))
+        bpe = HindiBPE(vocab_size=60)
+        bpe.fit(counts, memory_budget_mb=(peak_rss_mb() or 0.0) + 256)
+        self.assertEqual(counts, {})
+        self.assertEqual(bpe.merges, expected.merges)
+        self.assertEqual(bpe.memory_report['trained_words'], len(count_words(TEXTS)))
+        self.assertEqual(bpe.memory_report['excluded_words'], 0)
+
+
+class SharedModelTest(unittest.TestCase):
+    def test_threads_share_freshly_loaded_model(self):
+        bpe = HindiBPE(vocab_size=60)
+        bpe.fit(TEXTS)
+        expected = bpe.encode(TEXTS[0])
+        interval = sys.getswitchinterval()
+        # Switch threads as often as possible to hit the lazy table builds
+        sys.setswitchinterval(1e-6)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for name in ("model.json", "model.bin"):
+                    path = os.path.join(directory, name)
+                    bpe.save_model(path)
+                    for _ in range(10):
+                        loaded = HindiBPE()
+                        loaded.load_model(path)
+                        barrier = threading.Barrier(8)
+                        results = []
+
+                        def encode():
+                            barrier.wait()
+                            try:
+                                results.append(loaded.encode(TEXTS[0]))
+                            except Exception as error:
+                                results.append(error)
+
+                        threads = [threading.Thread(target=encode) for _ in range(8)]
+                        for thread in threads:
+                            thread.start()
+                        for thread in threads:
+                            thread.join()
+                        self.assertEqual(results, [expected] * 8)
+        finally:
+            sys.setswitchinterval(interval)
+
+
+if __name__ == "__main__":
+    unittest.main()
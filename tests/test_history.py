@@ -0,0 +1,79 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from history import EncodedHistory
+
+ENTRY = {'original_text': "भारत", 'indices': [1, 2], 'tokens': ["भा", "रत"],
+         'token_mappings': {'1': "भा", '2': "रत"}}
+
+
+def _open_store(barrier, path, legacy_path):
+    barrier.wait()
+    EncodedHistory(path, legacy_path)
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "history.db")
+        self.legacy_path = os.path.join(self.directory.name, "history.json")
+        with open(self.legacy_path, 'w', encoding='utf-8') as f:
+            json.dump({'texts': [ENTRY] * 3}, f, ensure_ascii=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_concurrent_opens_import_legacy_history_once(self):
+        # Start every process first so they all open the new store together
+        barrier = multiprocessing.Barrier(8)
+        processes = [multiprocessing.Process(target=_open_store, args=(barrier, self.path, self.legacy_path))
+                     for _ in range(8)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        self.assertEqual(EncodedHistory(self.path, self.legacy_path).count(), 3)
+
+    def test_existing_database_is_not_reimported(self):
+        # A database from before the migration marker, already holding rows
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE encoded_texts (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "original_text TEXT NOT NULL, indices BLOB NOT NULL, tokens TEXT NOT NULL, "
+                         "token_mappings TEXT NOT NULL)")
+        history = EncodedHistory(self.path, None)
+        history.append(ENTRY)
+        EncodedHistory(self.path, self.legacy_path)
+        self.assertEqual(history.count(), 1)
+
+    def test_migrate_from_json_imports_once(self):
+        history = EncodedHistory(self.path, self.legacy_path)
+        self.assertEqual(history.migrate_from_json(self.legacy_path), 0)
+        self.assertEqual(history.count(), 3)
+
+        os.remove(self.path)
+        history = EncodedHistory(self.path, None)
+        self.assertEqual(history.migrate_from_json(self.legacy_path), 3)
+        self.assertEqual(history.migrate_from_json(self.legacy_path), 0)
+        self.assertEqual(history.count(), 3)
+
+    def test_append_and_read_back(self):
+        history = EncodedHistory(self.path, self.legacy_path)
+        history.append(dict(ENTRY, original_text="नया"))
+        self.assertEqual(history.count(), 4)
+        self.assertEqual(history.recent(1)[0]['original_text'], "नया")
+        self.assertEqual(history.recent(1)[0]['indices'], [1, 2])
+
+    def test_count_of_empty_store(self):
+        history = EncodedHistory(self.path, None)
+        self.assertEqual(history.count(), 0)
+        history.extend([ENTRY] * 2)
+        self.assertEqual(history.count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
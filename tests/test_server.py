@@ -0,0 +1,138 @@
+import asyncio
+import json
+import unittest
+
+from bpe import HindiBPE
+from server import TokenizerServer
+
+TEXTS = [
+    "भारत एक विशाल देश है",
+    "भारत की संस्कृति बहुत पुरानी है",
+    "हिंदी भारत की राजभाषा है",
+]
+
+
+async def read_response(reader: asyncio.StreamReader):
+    """Read one response and return (status, headers, payload)"""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    return status, headers, json.loads(body)
+
+
+def request(method: str, path: str, body: bytes = b'', headers: str = '') -> bytes:
+    return (f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+            f"{headers}\r\n").encode('latin-1') + body
+
+
+class TokenizerServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bpe = HindiBPE(vocab_size=60)
+        self.bpe.fit(TEXTS)
+        self.server = TokenizerServer(self.bpe, workers=0, window=0.001)
+        self.http_server = await self.server.start('127.0.0.1', 0)
+        self.port = self.http_server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.http_server.close()
+        await self.http_server.wait_closed()
+        self.server.close()
+
+    async def post(self, path: str, data) -> tuple:
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.writer.write(request('POST', path, body))
+        await self.writer.drain()
+        status, _, payload = await read_response(self.reader)
+        return status, payload
+
+    async def test_encode_and_decode(self):
+        status, payload = await self.post('/encode', {'text': TEXTS[0]})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['indices'], self.bpe.encode(TEXTS[0]))
+
+        status, payload = await self.post('/decode', {'indices': payload['indices']})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['text'], TEXTS[0])
+
+    async def test_batches(self):
+        status, payload = await self.post('/encode_batch', {'texts': TEXTS})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['indices'], [self.bpe.encode(text) for text in TEXTS])
+
+        status, payload = await self.post('/decode_batch', {'indices': payload['indices']})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['texts'], TEXTS)
+
+        status, payload = await self.post('/encode_batch', {'texts': []})
+        self.assertEqual((status, payload), (200, {'indices': []}))
+
+    async def test_batch_is_split_across_workers(self):
+        self.server.workers = 2
+        texts = TEXTS * 3
+        status, payload = await self.post('/encode_batch', {'texts': texts})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['indices'], [self.bpe.encode(text) for text in texts])
+
+    async def test_concurrent_single_requests(self):
+        connections = [await asyncio.open_connection('127.0.0.1', self.port) for _ in TEXTS]
+        for (_, writer), text in zip(connections, TEXTS):
+            writer.write(request('POST', '/encode', json.dumps({'text': text}).encode('utf-8')))
+        responses = await asyncio.gather(*(read_response(reader) for reader, _ in connections))
+        for (status, _, payload), text in zip(responses, TEXTS):
+            self.assertEqual(status, 200)
+            self.assertEqual(payload['indices'], self.bpe.encode(text))
+        for _, writer in connections:
+            writer.close()
+
+    async def test_error_statuses(self):
+        status, _ = await self.post('/missing', {})
+        self.assertEqual(status, 404)
+
+        self.writer.write(request('GET', '/encode'))
+        status, _, _ = await read_response(self.reader)
+        self.assertEqual(status, 405)
+
+        self.writer.write(request('POST', '/encode', b'not json'))
+        status, _, _ = await read_response(self.reader)
+        self.assertEqual(status, 400)
+
+        status, _ = await self.post('/encode', {'txt': TEXTS[0]})
+        self.assertEqual(status, 400)
+
+        # The connection is still usable after errors with a consumed body
+        status, _ = await self.post('/encode', {'text': TEXTS[0]})
+        self.assertEqual(status, 200)
+
+        self.writer.write(request('GET', '/health'))
+        status, _, payload = await read_response(self.reader)
+        self.assertEqual((status, payload), (200, {'status': 'ok'}))
+
+    async def test_payload_too_large_closes_connection(self):
+        self.server.max_body = 16
+        body = json.dumps({'text': TEXTS[1]}).encode('utf-8')
+        # The unread body must not be parsed as the next request
+        self.writer.write(request('POST', '/encode', body) + request('GET', '/health'))
+        status, headers, _ = await read_response(self.reader)
+        self.assertEqual(status, 413)
+        self.assertEqual(headers['connection'], 'close')
+        self.assertEqual(await self.reader.read(), b'')
+
+    async def test_bad_content_length_closes_connection(self):
+        self.writer.write(b"POST /encode HTTP/1.1\r\nContent-Length: abc\r\n\r\n{}")
+        status, headers, _ = await read_response(self.reader)
+        self.assertEqual(status, 400)
+        self.assertEqual(headers['connection'], 'close')
+        self.assertEqual(await self.reader.read(), b'')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import random
+import tempfile
+import unittest
+
+from bpe import HindiBPE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ENGINES = ['python', 'compact'] + (['numpy'] if numpy is not None else [])
+
+TEXTS = [
+    "भारत एक विशाल देश है",
+    "भारत की संस्कृति बहुत पुरानी है",
+    "हिंदी भारत की राजभाषा है",
+    "दिल्ली भारत की राजधानी है",
+]
+
+
+def reference_tokens(texts, vocab_size: int, min_freq: int = 1):
+    """Train with the original get_stats/merge_vocab loop and return the tokens by index
+
+    A dict of word counts is expanded into that many copies of each word.
+    """
+    if isinstance(texts, dict):
+        texts = [word for word, count in texts.items() for _ in range(count)]
+    bpe = HindiBPE()
+    words = [list(text) for text in texts]
+    tokens = ["<UNK>"] + sorted(set(char for text in texts for char in text))
+    while len(tokens) < vocab_size:
+        pairs = bpe.get_stats(words)
+        frequent_pairs = {pair: freq for pair, freq in pairs.items() if freq >= min_freq}
+        if not frequent_pairs:
+            break
+        best_pair = max(frequent_pairs.items(), key=lambda x: x[1])[0]
+        if len(''.join(best_pair)) > 35:
+            break
+        words = bpe.merge_vocab(words, best_pair)
+        tokens.append(''.join(best_pair))
+    return tokens
+
+
+def trained_tokens(bpe: HindiBPE):
+    return [bpe.index_to_token[idx] for idx in range(len(bpe.index_to_token))]
+
+
+def random_corpus(rng: random.Random):
+    """Short texts over a tiny alphabet, so ties and overlapping runs are common"""
+    return [''.join(rng.choice("aab c") for _ in range(rng.randint(0, 12)))
+            for _ in range(rng.randint(1, 8))]
+
+
+class EngineEquivalenceTest(unittest.TestCase):
+    def assertMatchesReference(self, texts, vocab_size: int, min_freq: int = 1):
+        expected = reference_tokens(texts, vocab_size, min_freq)
+        for engine in ENGINES:
+            with self.subTest(engine=engine, texts=texts, min_freq=min_freq):
+                bpe = HindiBPE(vocab_size=vocab_size, min_freq=min_freq)
+                bpe.fit(dict(texts) if isinstance(texts, dict) else texts, engine=engine)
+                self.assertEqual(trained_tokens(bpe), expected)
+
+    def test_hindi_texts(self):
+        self.assertMatchesReference(TEXTS, 80)
+
+    def test_ties_break_by_first_occurrence(self):
+        self.assertMatchesReference(["cd ab", "ab cd", "ef"], 20)
+        self.assertMatchesReference(["xy yx", "yx xy"], 20)
+
+    def test_overlapping_runs(self):
+        self.assertMatchesReference(["aaaa", "aaaaa", "aaa b aaaa"], 20)
+        self.assertMatchesReference(["abababa", "aaabbb"], 20)
+
+    def test_weighted_word_counts(self):
+        self.assertMatchesReference({" ab": 3, " ba": 3, " aab": 1, " bbb": 2}, 20)
+        self.assertMatchesReference({" aaaa": 5, " ab": 7}, 20)
+
+    def test_min_freq(self):
+        for min_freq in (2, 3):
+            self.assertMatchesReference(TEXTS, 80, min_freq)
+            self.assertMatchesReference({" aaaa": 2, " ab": 1, " ba": 4}, 20, min_freq)
+
+    def test_random_corpora(self):
+        rng = random.Random(0)
+        for _ in range(100):
+            texts = random_corpus(rng)
+            if rng.random() < 0.5:
+                texts = {text: rng.randint(1, 4) for text in texts}
+            self.assertMatchesReference(texts, rng.randint(5, 30), rng.choice([1, 1, 2, 3]))
+
+
+class IncrementalTrainingTest(unittest.TestCase):
+    def test_extend_matches_full_run(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                full = HindiBPE(vocab_size=80)
+                full.fit(TEXTS, engine=engine)
+                bpe = HindiBPE(vocab_size=50)
+                bpe.fit(TEXTS, engine=engine)
+                bpe.extend(TEXTS, 80, engine=engine)
+                self.assertEqual(trained_tokens(bpe), trained_tokens(full))
+
+    def test_resume_matches_full_run(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine), tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "checkpoint.json")
+                full = HindiBPE(vocab_size=80)
+                full.fit(TEXTS, engine=engine)
+                # A run stopped at 50 tokens leaves the checkpoint an interrupted run would
+                HindiBPE(vocab_size=50).fit(TEXTS, checkpoint_path=path, checkpoint_every=7,
+                                            engine=engine)
+                bpe = HindiBPE(vocab_size=80)
+                bpe.fit(None, checkpoint_path=path, resume=True, engine=engine)
+                self.assertEqual(trained_tokens(bpe), trained_tokens(full))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,359 @@
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+from collections import defaultdict
+from itertools import repeat
+import heapq
+
+
+class PairTrainer:
+    """Incremental pair statistics for BPE training.
+
+    All words are laid out back to back as one flat symbol array. Each
+    symbol is addressed by the position of its first character, and
+    ``_next``/``_prev`` link the symbols of a word together (-1 marks a
+    word boundary). Because positions never move, ``(count, first
+    position)`` orders pairs exactly like ``max`` over the dict returned
+    by ``HindiBPE.get_stats``, which keeps the learned merges identical.
+    """
+
+    def __init__(self, words: List[List[str]], weights: Optional[List[int]] = None, min_freq: int = 1):
+        # Pairs below min_freq can never win best_pair, so they stay off the heap
+        self.min_freq = min_freq
+        self._symbols: List[Optional[str]] = []
+        self._next: List[int] = []
+        self._prev: List[int] = []
+        self._weight: List[int] = []
+        self._weighted = weights is not None
+
+        for w, word in enumerate(words):
+            start = len(self._symbols)
+            weight = weights[w] if weights is not None else 1
+            for i, char in enumerate(word):
+                self._symbols.append(char)
+                self._prev.append(start + i - 1 if i > 0 else -1)
+                self._next.append(start + i + 1 if i < len(word) - 1 else -1)
+                self._weight.append(weight)
+
+        self.counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.occurrences: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        self._first: Dict[Tuple[str, str], Optional[int]] = {}
+        self._heap: List[Tuple[int, int, Tuple[str, str]]] = []
+        self._touched: Set[Tuple[str, str]] = set()
+
+        for pos, nxt in enumerate(self._next):
+            if nxt != -1:
+                self._add(pos)
+        self._flush()
+
+    def _pair_at(self, pos: int) -> Tuple[str, str]:
+        return (self._symbols[pos], self._symbols[self._next[pos]])
+
+    def _add(self, pos: int) -> None:
+        pair = self._pair_at(pos)
+        self.counts[pair] += self._weight[pos]
+        self.occurrences[pair].add(pos)
+        first = self._first.get(pair)
+        if pair not in self._first or (first is not None and pos < first):
+            self._first[pair] = pos
+        self._touched.add(pair)
+
+    def _remove(self, pos: int) -> None:
+        pair = self._pair_at(pos)
+        self.counts[pair] -= self._weight[pos]
+        self.occurrences[pair].discard(pos)
+        if self._first.get(pair) == pos:
+            self._first[pair] = None
+        self._touched.add(pair)
+
+    def _flush(self) -> None:
+        """Push a fresh heap entry for every pair changed since the last flush"""
+        for pair in self._touched:
+            if not self.occurrences[pair]:
+                del self.counts[pair]
+                del self.occurrences[pair]
+                del self._first[pair]
+                continue
+            if self.counts[pair] < self.min_freq:
+                continue
+            if self._first[pair] is None:
+                self._first[pair] = min(self.occurrences[pair])
+            heapq.heappush(self._heap, (-self.counts[pair], self._first[pair], pair))
+        self._touched.clear()
+
+    def best_pair(self, min_freq: int = 1) -> Optional[Tuple[str, str]]:
+        """Return the most frequent pair, or None if none reaches min_freq"""
+        while self._heap:
+            neg_count, first, pair = self._heap[0]
+            # Entries are never updated in place, so skip any that are stale
+            if self.counts.get(pair) != -neg_count or self._first.get(pair) != first:
+                heapq.heappop(self._heap)
+                continue
+            return pair if -neg_count >= min_freq else None
+        return None
+
+    def merge(self, pair: Tuple[str, str]) -> None:
+        """Merge every occurrence of pair, updating only the neighbouring pairs"""
+        first, second = pair
+        new_token = first + second
+
+        # Left to right so overlapping runs merge like HindiBPE.merge_vocab
+        for pos in sorted(self.occurrences.get(pair, ())):
+            right = self._next[pos]
+            if right == -1 or self._symbols[pos] != first or self._symbols[right] != second:
+                continue
+
+            left = self._prev[pos]
+            after = self._next[right]
+            if left != -1:
+                self._remove(left)
+            if after != -1:
+                self._remove(right)
+            self._remove(pos)
+
+            self._symbols[pos] = new_token
+            self._symbols[right] = None
+            self._next[pos] = after
+            if after != -1:
+                self._prev[after] = pos
+
+            if left != -1:
+                self._add(left)
+            if after != -1:
+                self._add(pos)
+
+        self._flush()
+
+    def weights(self) -> Optional[List[int]]:
+        """Return the weight of every word, or None if words are unweighted"""
+        if not self._weighted:
+            return None
+        return [self._weight[pos] for pos, prev in enumerate(self._prev)
+                if prev == -1 and self._symbols[pos] is not None]
+
+    def words(self) -> List[List[str]]:
+        """Return the current segmentation of every word"""
+        result = []
+        current: List[str] = []
+        for pos, symbol in enumerate(self._symbols):
+            if symbol is None:
+                continue
+            current.append(symbol)
+            if self._next[pos] == -1:
+                result.append(current)
+                current = []
+        return result
+
+
+# Symbol id marking a position whose symbol was merged into its left neighbour
+_DEAD = 0xFFFFFFFF
+
+
+class CompactPairTrainer:
+    """Memory-lean variant of PairTrainer for large word tables
+
+    Symbols are interned to integer ids and the flat corpus lives in
+    ``array`` columns (4 bytes per field instead of a Python object per
+    character), pairs are packed into ``left << 32 | right`` int keys, and
+    occurrence lists are appends-only arrays that are cleaned up lazily.
+    Pairs whose count falls below min_freq drop their occurrence lists:
+    a pair only gains occurrences when one of its tokens is created, so it
+    can never be merged again. The rare exception, two merges producing
+    the same string, is caught by rescanning the corpus. The learned
+    merges are the same as PairTrainer's.
+    """
+
+    # Rough peak bytes per corpus symbol, measured with tracemalloc over a
+    # few thousand merges. The initial tables take about a fifth of this,
+    # the rest is pair tables growing as merges create new pairs
+    BYTES_PER_SYMBOL = 120
+
+    __slots__ = ('min_freq', 'counts', 'occurrences', '_symbols', '_symbol_ids', '_sym', '_next',
+                 '_prev', '_weight', '_weighted', '_first', '_heap', '_touched', '_pruned')
+
+    def __init__(self, words: List[List[str]], weights: Optional[List[int]] = None, min_freq: int = 1):
+        self.min_freq = min_freq
+        self._symbols: List[str] = []
+        self._symbol_ids: Dict[str, int] = {}
+        self._sym = array('I')
+        self._next = array('i')
+        self._prev = array('i')
+        self._weight = array('I')
+        self._weighted = weights is not None
+
+        symbol_ids = self._symbol_ids
+        for w, word in enumerate(words):
+            start = len(self._sym)
+            end = start + len(word)
+            if start == end:
+                continue
+            for char in word:
+                idx = symbol_ids.get(char)
+                if idx is None:
+                    idx = symbol_ids[char] = len(self._symbols)
+                    self._symbols.append(char)
+                self._sym.append(idx)
+            self._prev.append(-1)
+            self._prev.extend(range(start, end - 1))
+            self._next.extend(range(start + 1, end))
+            self._next.append(-1)
+            self._weight.extend(repeat(weights[w] if weights is not None else 1, end - start))
+
+        self.counts: Dict[int, int] = {}
+        self.occurrences: Dict[int, array] = {}
+        self._first: Dict[int, Optional[int]] = {}
+        self._heap: List[Tuple[int, int, int]] = []
+        self._touched: Set[int] = set()
+        # Pairs below min_freq whose occurrence lists were dropped
+        self._pruned: Set[int] = set()
+
+        for pos, nxt in enumerate(self._next):
+            if nxt != -1:
+                self._add(pos)
+        self._flush()
+
+    def _key_at(self, pos: int) -> int:
+        return self._sym[pos] << 32 | self._sym[self._next[pos]]
+
+    def _is_at(self, key: int, pos: int) -> bool:
+        nxt = self._next[pos]
+        return nxt != -1 and self._sym[pos] == key >> 32 and self._sym[nxt] == key & 0xFFFFFFFF
+
+    def _scan(self, key: int) -> array:
+        return array('I', (pos for pos in range(len(self._sym)) if self._is_at(key, pos)))
+
+    def _add(self, pos: int) -> None:
+        key = self._key_at(pos)
+        self.counts[key] = self.counts.get(key, 0) + self._weight[pos]
+        if key not in self._pruned:
+            occurrences = self.occurrences.get(key)
+            if occurrences is None:
+                self.occurrences[key] = array('I', [pos])
+            else:
+                occurrences.append(pos)
+        first = self._first.get(key)
+        if key not in self._first or (first is not None and pos < first):
+            self._first[key] = pos
+        self._touched.add(key)
+
+    def _remove(self, pos: int) -> None:
+        # Occurrence lists keep the stale position until they are cleaned up
+        key = self._key_at(pos)
+        self.counts[key] -= self._weight[pos]
+        if self._first.get(key) == pos:
+            self._first[key] = None
+        self._touched.add(key)
+
+    def _flush(self) -> None:
+        """Push a fresh heap entry for every pair changed since the last flush"""
+        counts = self.counts
+        for key in self._touched:
+            count = counts[key]
+            if count <= 0:
+                del counts[key]
+                self.occurrences.pop(key, None)
+                self._first.pop(key, None)
+                self._pruned.discard(key)
+                continue
+            if key in self._pruned:
+                if count < self.min_freq:
+                    continue
+                self._pruned.discard(key)
+                self.occurrences[key] = self._scan(key)
+                self._first[key] = None
+            elif count < self.min_freq:
+                self._pruned.add(key)
+                del self.occurrences[key]
+                continue
+            if self._first[key] is None:
+                positions = array('I', sorted(set(pos for pos in self.occurrences[key] if self._is_at(key, pos))))
+                self.occurrences[key] = positions
+                self._first[key] = positions[0]
+            heapq.heappush(self._heap, (-count, self._first[key], key))
+        self._touched.clear()
+
+        # Drop stale heap entries once they outnumber the pairs that can
+        # be on the heap, which excludes pruned ones
+        if len(self._heap) > 2 * len(self.occurrences) + 1024:
+            self._heap = [(-count, self._first[key], key) for key, count in counts.items()
+                          if key not in self._pruned]
+            heapq.heapify(self._heap)
+
+    def best_pair(self, min_freq: int = 1) -> Optional[Tuple[str, str]]:
+        """Return the most frequent pair, or None if none reaches min_freq"""
+        while self._heap:
+            neg_count, first, key = self._heap[0]
+            if self.counts.get(key) != -neg_count or self._first.get(key) != first or key in self._pruned:
+                heapq.heappop(self._heap)
+                continue
+            if -neg_count < min_freq:
+                return None
+            return (self._symbols[key >> 32], self._symbols[key & 0xFFFFFFFF])
+        return None
+
+    def merge(self, pair: Tuple[str, str]) -> None:
+        """Merge every occurrence of pair, updating only the neighbouring pairs"""
+        first, second = pair
+        left = self._symbol_ids.get(first)
+        right = self._symbol_ids.get(second)
+        if left is None or right is None:
+            return
+        key = left << 32 | right
+        positions = self.occurrences.get(key)
+        if positions is None:
+            # Pruned pairs can still be merged when replaying a model's merges
+            positions = self._scan(key) if key in self.counts else ()
+
+        new_token = first + second
+        new_id = self._symbol_ids.get(new_token)
+        if new_id is None:
+            new_id = self._symbol_ids[new_token] = len(self._symbols)
+            self._symbols.append(new_token)
+
+        sym, nxt, prev = self._sym, self._next, self._prev
+        # Left to right so overlapping runs merge like HindiBPE.merge_vocab
+        for pos in sorted(set(positions)):
+            right_pos = nxt[pos]
+            if right_pos == -1 or sym[pos] != left or sym[right_pos] != right:
+                continue
+
+            left_pos = prev[pos]
+            after = nxt[right_pos]
+            if left_pos != -1:
+                self._remove(left_pos)
+            if after != -1:
+                self._remove(right_pos)
+            self._remove(pos)
+
+            sym[pos] = new_id
+            sym[right_pos] = _DEAD
+            nxt[pos] = after
+            if after != -1:
+                prev[after] = pos
+
+            if left_pos != -1:
+                self._add(left_pos)
+            if after != -1:
+                self._add(pos)
+
+        self._flush()
+
+    def weights(self) -> Optional[List[int]]:
+        """Return the weight of every word, or None if words are unweighted"""
+        if not self._weighted:
+            return None
+        return [self._weight[pos] for pos, prev in enumerate(self._prev)
+                if prev == -1 and self._sym[pos] != _DEAD]
+
+    def words(self) -> List[List[str]]:
+        """Return the current segmentation of every word"""
+        symbols = self._symbols
+        result = []
+        current: List[str] = []
+        for symbol, nxt in zip(self._sym, self._next):
+            if symbol == _DEAD:
+                continue
+            current.append(symbols[symbol])
+            if nxt == -1:
+                result.append(current)
+                current = []
+        return result
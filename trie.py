@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional, Sequence
+
+
+class TokenTrie:
+    """Character trie over the vocabulary for greedy longest-match encoding
+
+    The trie is stored flat for serialization: node_token[n] is the token id
+    ending at node n (-1 if none) and the edges of node n are
+    edge_char/edge_child[edge_start[n]:edge_start[n + 1]], with edge_char
+    holding code points. Node 0 is the root.
+    """
+
+    def __init__(self, node_token: Sequence[int], edge_start: Sequence[int],
+                 edge_char: Sequence[int], edge_child: Sequence[int]):
+        self.node_token = list(node_token)
+        self.edge_start = list(edge_start)
+        self.edge_char = list(edge_char)
+        self.edge_child = list(edge_child)
+        # Per-node child dicts used while segmenting
+        self._children: List[Dict[str, int]] = [
+            {chr(self.edge_char[e]): self.edge_child[e]
+             for e in range(self.edge_start[n], self.edge_start[n + 1])}
+            for n in range(len(self.node_token))
+        ]
+
+    @classmethod
+    def from_tokens(cls, token_to_index: Dict[str, int]) -> "TokenTrie":
+        """Build a trie containing every token of the vocabulary"""
+        children: List[Dict[str, int]] = [{}]
+        node_token = [-1]
+        for token, idx in token_to_index.items():
+            node = 0
+            for char in token:
+                child = children[node].get(char)
+                if child is None:
+                    child = children[node][char] = len(children)
+                    children.append({})
+                    node_token.append(-1)
+                node = child
+            node_token[node] = idx
+
+        edge_start = [0]
+        edge_char = []
+        edge_child = []
+        for edges in children:
+            for char, child in sorted(edges.items()):
+                edge_char.append(ord(char))
+                edge_child.append(child)
+            edge_start.append(len(edge_char))
+        return cls(node_token, edge_start, edge_char, edge_child)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TokenTrie":
+        return cls(data['node_token'], data['edge_start'], data['edge_char'], data['edge_child'])
+
+    def to_dict(self) -> Dict[str, List[int]]:
+        return {
+            'node_token': self.node_token,
+            'edge_start': self.edge_start,
+            'edge_char': self.edge_char,
+            'edge_child': self.edge_child,
+        }
+
+    def segment(self, text: str, unk_id: int, byte_offset: Optional[int] = None) -> List[int]:
+        """Split text into the longest vocabulary tokens, left to right
+
+        Characters no token starts with become unk_id, or the ids of their
+        UTF-8 bytes counted from byte_offset when it is given.
+        """
+        children = self._children
+        node_token = self.node_token
+        indices = []
+        i = 0
+        n = len(text)
+        while i < n:
+            node = 0
+            best = -1
+            best_end = i + 1
+            j = i
+            while j < n:
+                node = children[node].get(text[j])
+                if node is None:
+                    break
+                j += 1
+                if node_token[node] >= 0:
+                    best = node_token[node]
+                    best_end = j
+            if best >= 0:
+                indices.append(best)
+            elif byte_offset is not None:
+                indices.extend(byte_offset + byte for byte in text[i].encode('utf-8'))
+            else:
+                indices.append(unk_id)
+            i = best_end
+        return indices
+
+
+def divergence_report(bpe, texts: List[str]) -> Dict:
+    """Compare longest-match encoding with merge-based encoding on texts"""
+    differing = 0
+    merge_tokens = 0
+    trie_tokens = 0
+    for text in texts:
+        merged = bpe.encode(text)
+        matched = bpe.encode(text, longest_match=True)
+        merge_tokens += len(merged)
+        trie_tokens += len(matched)
+        if merged != matched:
+            differing += 1
+    return {
+        'texts': len(texts),
+        'differing_texts': differing,
+        'differing_rate': differing / len(texts) if texts else 0.0,
+        'merge_tokens': merge_tokens,
+        'longest_match_tokens': trie_tokens,
+    }
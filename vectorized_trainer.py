@@ -0,0 +1,180 @@
+from typing import Dict, List, Optional, Set, Tuple
+import heapq
+import numpy as np
+
+
+class VectorizedPairTrainer:
+    """NumPy pair statistics for BPE training, a drop-in for trainer.PairTrainer
+
+    The corpus is a flat int64 array of symbol ids, linked into words by
+    ``_next``/``_prev`` position arrays (-1 marks a word boundary) like
+    PairTrainer, and ``_key[pos]`` packs the pair starting at pos into one
+    int64 (``left << 32 | right``, -1 for none). Initial counts and every
+    merge's count changes come from np.unique/np.bincount over those keys,
+    and merges rewrite the arrays with index masks, so Python only loops
+    over the distinct pairs a merge touches rather than every occurrence.
+    Ties break on the first position of a pair, as in PairTrainer, so the
+    learned merges are the same.
+    """
+
+    def __init__(self, words: List[List[str]], weights: Optional[List[int]] = None, min_freq: int = 1):
+        # Pairs below min_freq can never win best_pair, so they stay off the heap
+        self.min_freq = min_freq
+        self._symbols: List[str] = []
+        self._symbol_ids: Dict[str, int] = {}
+        for word in words:
+            for char in word:
+                if char not in self._symbol_ids:
+                    self._symbol_ids[char] = len(self._symbols)
+                    self._symbols.append(char)
+
+        lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+        n = int(lengths.sum())
+        self._sym = np.fromiter((self._symbol_ids[char] for word in words for char in word),
+                                dtype=np.int64, count=n)
+        self._weighted = weights is not None
+        word_weights = np.asarray(weights if weights is not None else np.ones(len(words)), dtype=np.int64)
+        self._weight = np.repeat(word_weights, lengths)
+
+        positions = np.arange(n, dtype=np.int64)
+        ends = np.cumsum(lengths)[lengths > 0]
+        self._next = positions + 1
+        self._prev = positions - 1
+        self._next[ends - 1] = -1
+        self._prev[ends - lengths[lengths > 0]] = -1
+
+        self._key = np.full(n, -1, dtype=np.int64)
+        starts = np.flatnonzero(self._next != -1)
+        self._key[starts] = self._sym[starts] << 32 | self._sym[starts + 1]
+
+        self.counts: Dict[int, int] = {}
+        self._first: Dict[int, int] = {}
+        # Pairs whose stored first position is only a lower bound
+        self._stale: Set[int] = set()
+        keys, first, inverse = np.unique(self._key[starts], return_index=True, return_inverse=True)
+        counts = np.bincount(inverse, weights=self._weight[starts], minlength=len(keys)).astype(np.int64)
+        self._heap: List[Tuple[int, int, int]] = []
+        for key, count, pos in zip(keys.tolist(), counts.tolist(), starts[first].tolist()):
+            self.counts[key] = count
+            self._first[key] = pos
+            if count >= min_freq:
+                self._heap.append((-count, pos, key))
+        heapq.heapify(self._heap)
+
+    def best_pair(self, min_freq: int = 1) -> Optional[Tuple[str, str]]:
+        """Return the most frequent pair, or None if none reaches min_freq"""
+        heap = self._heap
+        while heap:
+            neg_count, first, key = heap[0]
+            # Entries are never updated in place, so skip any that are stale
+            if self.counts.get(key) != -neg_count or self._first.get(key) != first:
+                heapq.heappop(heap)
+                continue
+            if key in self._stale:
+                # Find the real first position only once the pair could win
+                self._stale.discard(key)
+                first = self._first[key] = int(np.flatnonzero(self._key == key)[0])
+                heapq.heapreplace(heap, (neg_count, first, key))
+                continue
+            if -neg_count < min_freq:
+                return None
+            return (self._symbols[key >> 32], self._symbols[key & 0xFFFFFFFF])
+        return None
+
+    def merge(self, pair: Tuple[str, str]) -> None:
+        """Merge every occurrence of pair, leftmost first within overlapping runs"""
+        first, second = pair
+        left = self._symbol_ids.get(first)
+        right = self._symbol_ids.get(second)
+        if left is None or right is None:
+            return
+        sym, nxt, prv, keys, weight = self._sym, self._next, self._prev, self._key, self._weight
+        positions = np.flatnonzero(keys == (left << 32 | right))
+        if not len(positions):
+            return
+
+        if left == right:
+            # In a run like "a a a" only every other pair can merge,
+            # counting from the start of the run
+            index = np.arange(len(positions))
+            chained = np.zeros(len(positions), dtype=bool)
+            chained[1:] = nxt[positions[:-1]] == positions[1:]
+            run_start = np.maximum.accumulate(np.where(chained, 0, index))
+            positions = positions[(index - run_start) % 2 == 0]
+
+        new_token = first + second
+        new_id = self._symbol_ids.get(new_token)
+        if new_id is None:
+            new_id = self._symbol_ids[new_token] = len(self._symbols)
+            self._symbols.append(new_token)
+
+        # Pairs starting left of, at, or right of each merged pair disappear
+        rights = nxt[positions]
+        removed = np.unique(np.concatenate((prv[positions], positions, rights)))
+        removed = removed[removed >= 0]
+        removed = removed[keys[removed] != -1]
+        removed_keys = keys[removed]
+
+        afters = nxt[rights]
+        has_after = afters != -1
+        sym[positions] = new_id
+        sym[rights] = -1
+        keys[rights] = -1
+        keys[positions[~has_after]] = -1
+        nxt[positions] = afters
+        prv[afters[has_after]] = positions[has_after]
+
+        # New pairs start left of and at each merged symbol
+        added = np.unique(np.concatenate((prv[positions], positions[has_after])))
+        added = added[added >= 0]
+        keys[added] = sym[added] << 32 | sym[nxt[added]]
+        added_keys = keys[added]
+
+        changed, inverse = np.unique(np.concatenate((removed_keys, added_keys)), return_inverse=True)
+        deltas = np.bincount(inverse, weights=np.concatenate((-weight[removed], weight[added])),
+                             minlength=len(changed)).astype(np.int64)
+        added_keys, added_first = np.unique(added_keys, return_index=True)
+        added_first = dict(zip(added_keys.tolist(), added[added_first].tolist()))
+        removed = set(removed.tolist())
+
+        counts = self.counts
+        firsts = self._first
+        stale = self._stale
+        for key, delta in zip(changed.tolist(), deltas.tolist()):
+            count = counts.get(key, 0) + delta
+            if count <= 0:
+                counts.pop(key, None)
+                firsts.pop(key, None)
+                stale.discard(key)
+                continue
+            pos = firsts.get(key)
+            if pos in removed:
+                stale.add(key)
+            new_pos = added_first.get(key)
+            if new_pos is not None and (pos is None or new_pos < pos):
+                pos = new_pos
+                stale.discard(key)
+            counts[key] = count
+            firsts[key] = pos
+            if count >= self.min_freq:
+                heapq.heappush(self._heap, (-count, pos, key))
+
+    def weights(self) -> Optional[List[int]]:
+        """Return the weight of every word, or None if words are unweighted"""
+        if not self._weighted:
+            return None
+        return self._weight[(self._prev == -1) & (self._sym != -1)].tolist()
+
+    def words(self) -> List[List[str]]:
+        """Return the current segmentation of every word"""
+        symbols = self._symbols
+        result = []
+        current: List[str] = []
+        for symbol, nxt in zip(self._sym.tolist(), self._next.tolist()):
+            if symbol == -1:
+                continue
+            current.append(symbols[symbol])
+            if nxt == -1:
+                result.append(current)
+                current = []
+        return result